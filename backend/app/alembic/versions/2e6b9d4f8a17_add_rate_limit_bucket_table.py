@@ -0,0 +1,33 @@
+"""Add rate limit bucket table
+
+Revision ID: 2e6b9d4f8a17
+Revises: 7b4f0e2c9d31
+Create Date: 2026-10-19 21:14:05.662390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '2e6b9d4f8a17'
+down_revision = '7b4f0e2c9d31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ratelimitbucket',
+        sa.Column('key', sqlmodel.sql.sqltypes.AutoString(length=320), nullable=False),
+        sa.Column('tokens', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index(op.f('ix_ratelimitbucket_updated_at'), 'ratelimitbucket', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index(op.f('ix_ratelimitbucket_updated_at'), table_name='ratelimitbucket')
+    op.drop_table('ratelimitbucket')
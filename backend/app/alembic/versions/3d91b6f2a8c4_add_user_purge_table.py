@@ -0,0 +1,36 @@
+"""Add user purge table
+
+Revision ID: 3d91b6f2a8c4
+Revises: e5a0c7f9b214
+Create Date: 2026-10-19 12:41:05.377218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '3d91b6f2a8c4'
+down_revision = 'e5a0c7f9b214'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'userpurge',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('status', sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+        sa.Column('items_deleted', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_userpurge_user_id'), 'userpurge', ['user_id'])
+
+
+def downgrade():
+    op.drop_index(op.f('ix_userpurge_user_id'), table_name='userpurge')
+    op.drop_table('userpurge')
@@ -0,0 +1,27 @@
+"""Index email outbox created_at
+
+Revision ID: 3f7d2b9c6e41
+Revises: 9a5f3c7e2d18
+Create Date: 2026-10-20 09:12:41.508316
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f7d2b9c6e41'
+down_revision = '9a5f3c7e2d18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Emails given up on kept their content, which may include a password
+    op.execute("UPDATE emailoutbox SET html_content = '' WHERE status = 'failed'")
+    op.create_index(
+        op.f('ix_emailoutbox_created_at'), 'emailoutbox', ['created_at']
+    )
+
+
+def downgrade():
+    op.drop_index(op.f('ix_emailoutbox_created_at'), table_name='emailoutbox')
@@ -0,0 +1,40 @@
+"""Add email outbox table
+
+Revision ID: 4c8a1e6d3b52
+Revises: 2e6b9d4f8a17
+Create Date: 2026-10-19 22:03:38.940156
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '4c8a1e6d3b52'
+down_revision = '2e6b9d4f8a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'emailoutbox',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('email_to', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+        sa.Column('subject', sqlmodel.sql.sqltypes.AutoString(length=998), nullable=False),
+        sa.Column('html_content', sa.Text(), nullable=False),
+        sa.Column('status', sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_emailoutbox_next_attempt_at'), 'emailoutbox', ['next_attempt_at'])
+
+
+def downgrade():
+    op.drop_index(op.f('ix_emailoutbox_next_attempt_at'), table_name='emailoutbox')
+    op.drop_table('emailoutbox')
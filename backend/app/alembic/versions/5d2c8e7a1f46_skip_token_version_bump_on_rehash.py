@@ -0,0 +1,48 @@
+"""Skip the token version bump on password rehash
+
+Revision ID: 5d2c8e7a1f46
+Revises: a9e3c1f7d024
+Create Date: 2026-10-19 19:42:11.503817
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2c8e7a1f46'
+down_revision = 'a9e3c1f7d024'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rehashing the same password with other costs sets app.password_rehash in
+    # its transaction, the tokens issued before stay valid
+    op.execute('DROP TRIGGER bump_token_version ON "user"')
+    op.execute('''
+        CREATE TRIGGER bump_token_version BEFORE UPDATE ON "user"
+        FOR EACH ROW
+        WHEN (
+            OLD.is_active IS DISTINCT FROM NEW.is_active
+            OR OLD.is_superuser IS DISTINCT FROM NEW.is_superuser
+            OR (
+                OLD.hashed_password IS DISTINCT FROM NEW.hashed_password
+                AND coalesce(current_setting('app.password_rehash', true), '') <> 'on'
+            )
+        )
+        EXECUTE FUNCTION bump_token_version()
+    ''')
+
+
+def downgrade():
+    op.execute('DROP TRIGGER bump_token_version ON "user"')
+    op.execute('''
+        CREATE TRIGGER bump_token_version BEFORE UPDATE ON "user"
+        FOR EACH ROW
+        WHEN (
+            OLD.is_active IS DISTINCT FROM NEW.is_active
+            OR OLD.is_superuser IS DISTINCT FROM NEW.is_superuser
+            OR OLD.hashed_password IS DISTINCT FROM NEW.hashed_password
+        )
+        EXECUTE FUNCTION bump_token_version()
+    ''')
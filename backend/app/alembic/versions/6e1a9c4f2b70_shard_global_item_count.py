@@ -0,0 +1,84 @@
+"""Shard the global item count
+
+Revision ID: 6e1a9c4f2b70
+Revises: 3f7d2b9c6e41
+Create Date: 2026-10-20 10:31:06.274183
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '6e1a9c4f2b70'
+down_revision = '3f7d2b9c6e41'
+branch_labels = None
+depends_on = None
+
+GLOBAL_ITEM_COUNT_ID = '00000000-0000-0000-0000-000000000000'
+GLOBAL_ITEM_COUNT_SHARDS = 16
+
+# Every item write used to update the one global row, serializing them all.
+# The total is now spread over the rows 0 to GLOBAL_ITEM_COUNT_SHARDS - 1,
+# picked by backend so concurrent connections update different rows.
+GLOBAL_SHARD = (
+    "('00000000-0000-0000-0000-' || "
+    f"lpad(to_hex(pg_backend_pid() % {GLOBAL_ITEM_COUNT_SHARDS}), 12, '0'))::uuid"
+)
+
+# Adds the per owner and global deltas of a statement to the counters. Counter
+# rows are locked in owner_id order so concurrent statements can't deadlock.
+APPLY_DELTAS = '''
+    INSERT INTO itemcount (owner_id, count)
+    SELECT owner_id, delta FROM (
+        SELECT owner_id, sum(delta) AS delta FROM ({deltas}) AS changes GROUP BY owner_id
+        UNION ALL
+        SELECT {global_id}, sum(delta) FROM ({deltas}) AS changes
+    ) AS totals
+    WHERE delta <> 0
+    ORDER BY owner_id
+    ON CONFLICT (owner_id) DO UPDATE SET count = itemcount.count + EXCLUDED.count;
+'''
+
+DELTAS = {
+    'INSERT': 'SELECT owner_id, 1 AS delta FROM new_items',
+    'DELETE': 'SELECT owner_id, -1 AS delta FROM old_items',
+    'UPDATE': (
+        'SELECT owner_id, 1 AS delta FROM new_items '
+        'UNION ALL SELECT owner_id, -1 FROM old_items'
+    ),
+}
+
+
+def replace_functions(global_id):
+    for operation, deltas in DELTAS.items():
+        name = f'item_count_after_{operation.lower()}'
+        op.execute(f'''
+            CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$
+            BEGIN
+                {APPLY_DELTAS.format(deltas=deltas, global_id=global_id)}
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        ''')
+
+
+def upgrade():
+    replace_functions(GLOBAL_SHARD)
+
+
+def downgrade():
+    replace_functions(f"'{GLOBAL_ITEM_COUNT_ID}'::uuid")
+    # Fold the shards back into the global row
+    op.execute('LOCK TABLE item IN SHARE MODE')
+    op.execute(f'''
+        UPDATE itemcount SET count = (
+            SELECT sum(count) FROM itemcount
+            WHERE owner_id <= '00000000-0000-0000-0000-{GLOBAL_ITEM_COUNT_SHARDS - 1:012x}'
+        )
+        WHERE owner_id = '{GLOBAL_ITEM_COUNT_ID}'
+    ''')
+    op.execute(f'''
+        DELETE FROM itemcount
+        WHERE owner_id > '{GLOBAL_ITEM_COUNT_ID}'
+        AND owner_id <= '00000000-0000-0000-0000-{GLOBAL_ITEM_COUNT_SHARDS - 1:012x}'
+    ''')
@@ -0,0 +1,48 @@
+"""Add refresh token table
+
+Revision ID: 7b4f0e2c9d31
+Revises: 5d2c8e7a1f46
+Create Date: 2026-10-19 20:31:47.218094
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '7b4f0e2c9d31'
+down_revision = '5d2c8e7a1f46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'refreshtoken',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('token_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+        sa.Column('family_id', sa.Uuid(), nullable=False),
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('token_version', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('used_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_refreshtoken_token_hash'), 'refreshtoken', ['token_hash'], unique=True)
+    op.create_index(op.f('ix_refreshtoken_family_id'), 'refreshtoken', ['family_id'])
+    op.create_index(op.f('ix_refreshtoken_user_id'), 'refreshtoken', ['user_id'])
+    op.create_index(op.f('ix_refreshtoken_expires_at'), 'refreshtoken', ['expires_at'])
+    op.create_index(op.f('ix_refreshtoken_revoked_at'), 'refreshtoken', ['revoked_at'])
+
+
+def downgrade():
+    op.drop_index(op.f('ix_refreshtoken_revoked_at'), table_name='refreshtoken')
+    op.drop_index(op.f('ix_refreshtoken_expires_at'), table_name='refreshtoken')
+    op.drop_index(op.f('ix_refreshtoken_user_id'), table_name='refreshtoken')
+    op.drop_index(op.f('ix_refreshtoken_family_id'), table_name='refreshtoken')
+    op.drop_index(op.f('ix_refreshtoken_token_hash'), table_name='refreshtoken')
+    op.drop_table('refreshtoken')
@@ -0,0 +1,31 @@
+"""Add GIN index on application form data
+
+Revision ID: 7c3e9a41d2b8
+Revises: 1a31ce608336, 2024_03_iso_certification
+Create Date: 2026-10-19 09:12:40.218734
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3e9a41d2b8'
+down_revision = ('1a31ce608336', '2024_03_iso_certification')
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # jsonb_path_ops only supports @>, @? and @@, but is smaller and faster
+    # than the default jsonb_ops for exactly the filters the API compiles
+    op.create_index(
+        'ix_applications_form_data',
+        'applications',
+        ['form_data'],
+        postgresql_using='gin',
+        postgresql_ops={'form_data': 'jsonb_path_ops'},
+    )
+
+
+def downgrade():
+    op.drop_index('ix_applications_form_data', table_name='applications')
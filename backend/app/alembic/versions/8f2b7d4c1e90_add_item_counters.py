@@ -0,0 +1,87 @@
+"""Add item counters
+
+Revision ID: 8f2b7d4c1e90
+Revises: 3d91b6f2a8c4
+Create Date: 2026-10-19 14:02:37.512948
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f2b7d4c1e90'
+down_revision = '3d91b6f2a8c4'
+branch_labels = None
+depends_on = None
+
+GLOBAL_ITEM_COUNT_ID = '00000000-0000-0000-0000-000000000000'
+
+# Adds the per owner and global deltas of a statement to the counters. Counter
+# rows are locked in owner_id order so concurrent statements can't deadlock.
+APPLY_DELTAS = '''
+    INSERT INTO itemcount (owner_id, count)
+    SELECT owner_id, delta FROM (
+        SELECT owner_id, sum(delta) AS delta FROM ({deltas}) AS changes GROUP BY owner_id
+        UNION ALL
+        SELECT '{global_id}'::uuid, sum(delta) FROM ({deltas}) AS changes
+    ) AS totals
+    WHERE delta <> 0
+    ORDER BY owner_id
+    ON CONFLICT (owner_id) DO UPDATE SET count = itemcount.count + EXCLUDED.count;
+'''
+
+# Statement level triggers with transition tables, so a bulk insert or delete
+# updates each counter once rather than once per row
+TRIGGERS = {
+    'INSERT': ('REFERENCING NEW TABLE AS new_items', 'SELECT owner_id, 1 AS delta FROM new_items'),
+    'DELETE': ('REFERENCING OLD TABLE AS old_items', 'SELECT owner_id, -1 AS delta FROM old_items'),
+    # Transition tables can't be combined with UPDATE OF owner_id, updates
+    # that keep the owner net out to zero and are skipped
+    'UPDATE': (
+        'REFERENCING OLD TABLE AS old_items NEW TABLE AS new_items',
+        'SELECT owner_id, 1 AS delta FROM new_items '
+        'UNION ALL SELECT owner_id, -1 FROM old_items',
+    ),
+}
+
+
+def upgrade():
+    op.create_table(
+        'itemcount',
+        sa.Column('owner_id', sa.Uuid(), nullable=False),
+        sa.Column('count', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('owner_id'),
+    )
+    for operation, (referencing, deltas) in TRIGGERS.items():
+        name = f'item_count_after_{operation.lower()}'
+        op.execute(f'''
+            CREATE FUNCTION {name}() RETURNS trigger AS $$
+            BEGIN
+                {APPLY_DELTAS.format(deltas=deltas, global_id=GLOBAL_ITEM_COUNT_ID)}
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        ''')
+        op.execute(f'''
+            CREATE TRIGGER {name} AFTER {operation} ON item
+            {referencing}
+            FOR EACH STATEMENT EXECUTE PROCEDURE {name}()
+        ''')
+    # Backfill from the existing items, the lock keeps writes from slipping in
+    # between the count and the triggers taking over
+    op.execute('LOCK TABLE item IN SHARE MODE')
+    op.execute(f'''
+        INSERT INTO itemcount (owner_id, count)
+        SELECT owner_id, count(*) FROM item GROUP BY owner_id
+        UNION ALL
+        SELECT '{GLOBAL_ITEM_COUNT_ID}'::uuid, count(*) FROM item
+    ''')
+
+
+def downgrade():
+    for operation in reversed(list(TRIGGERS)):
+        name = f'item_count_after_{operation.lower()}'
+        op.execute(f'DROP TRIGGER {name} ON item')
+        op.execute(f'DROP FUNCTION {name}()')
+    op.drop_table('itemcount')
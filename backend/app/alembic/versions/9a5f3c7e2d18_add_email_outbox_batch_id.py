@@ -0,0 +1,26 @@
+"""Add email outbox batch id
+
+Revision ID: 9a5f3c7e2d18
+Revises: 4c8a1e6d3b52
+Create Date: 2026-10-19 22:47:19.385021
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a5f3c7e2d18'
+down_revision = '4c8a1e6d3b52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('emailoutbox', sa.Column('batch_id', sa.Uuid(), nullable=True))
+    op.create_index(op.f('ix_emailoutbox_batch_id'), 'emailoutbox', ['batch_id'])
+
+
+def downgrade():
+    op.drop_index(op.f('ix_emailoutbox_batch_id'), table_name='emailoutbox')
+    op.drop_column('emailoutbox', 'batch_id')
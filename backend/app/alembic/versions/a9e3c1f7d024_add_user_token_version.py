@@ -0,0 +1,49 @@
+"""Add user token version
+
+Revision ID: a9e3c1f7d024
+Revises: f1d8a3c5b6e2
+Create Date: 2026-10-19 18:05:26.914302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9e3c1f7d024'
+down_revision = 'f1d8a3c5b6e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'user',
+        sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'),
+    )
+    # Stateless tokens carry is_active and is_superuser, any change to them or
+    # to the password has to revoke the tokens issued before
+    op.execute('''
+        CREATE FUNCTION bump_token_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.token_version = OLD.token_version + 1;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+    op.execute('''
+        CREATE TRIGGER bump_token_version BEFORE UPDATE ON "user"
+        FOR EACH ROW
+        WHEN (
+            OLD.is_active IS DISTINCT FROM NEW.is_active
+            OR OLD.is_superuser IS DISTINCT FROM NEW.is_superuser
+            OR OLD.hashed_password IS DISTINCT FROM NEW.hashed_password
+        )
+        EXECUTE FUNCTION bump_token_version()
+    ''')
+
+
+def downgrade():
+    op.execute('DROP TRIGGER bump_token_version ON "user"')
+    op.execute('DROP FUNCTION bump_token_version()')
+    op.drop_column('user', 'token_version')
@@ -0,0 +1,58 @@
+"""Add company search indexes
+
+Revision ID: b84f1d6e0c53
+Revises: 7c3e9a41d2b8
+Create Date: 2026-10-19 10:03:17.551092
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b84f1d6e0c53'
+down_revision = '7c3e9a41d2b8'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple'::regconfig, name), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, registration_number), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, contact_person), 'B') || "
+    "setweight(to_tsvector('simple'::regconfig, industry), 'C')"
+)
+
+TRIGRAM_COLUMNS = ['name', 'contact_person', 'registration_number']
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        'companies',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR, persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        'ix_companies_search_vector', 'companies', ['search_vector'], postgresql_using='gin'
+    )
+    for column in TRIGRAM_COLUMNS:
+        op.create_index(
+            f'ix_companies_{column}_trgm',
+            'companies',
+            [column],
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def downgrade():
+    for column in TRIGRAM_COLUMNS:
+        op.drop_index(f'ix_companies_{column}_trgm', table_name='companies')
+    op.drop_index('ix_companies_search_vector', table_name='companies')
+    op.drop_column('companies', 'search_vector')
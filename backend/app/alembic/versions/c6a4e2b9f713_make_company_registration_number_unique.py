@@ -0,0 +1,40 @@
+"""Make company registration number unique
+
+Revision ID: c6a4e2b9f713
+Revises: 8f2b7d4c1e90
+Create Date: 2026-10-19 15:20:11.048163
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6a4e2b9f713'
+down_revision = '8f2b7d4c1e90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Imports upsert on the registration number, which needs a unique index
+    # to be the conflict target. Duplicates have to be merged before this runs.
+    duplicates = op.get_bind().execute(sa.text(
+        'SELECT registration_number FROM companies '
+        'GROUP BY registration_number HAVING count(*) > 1 '
+        'ORDER BY registration_number LIMIT 10'
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            'Registration numbers shared by several companies, merge or renumber '
+            'them before upgrading: ' + ', '.join(duplicates)
+        )
+    op.drop_index('ix_companies_registration_number', table_name='companies')
+    op.create_index(
+        'ix_companies_registration_number', 'companies', ['registration_number'], unique=True
+    )
+
+
+def downgrade():
+    op.drop_index('ix_companies_registration_number', table_name='companies')
+    op.create_index('ix_companies_registration_number', 'companies', ['registration_number'])
@@ -0,0 +1,49 @@
+"""Index item owner_id and restore id server defaults
+
+Revision ID: e5a0c7f9b214
+Revises: b84f1d6e0c53
+Create Date: 2026-10-19 11:26:48.903615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a0c7f9b214'
+down_revision = 'b84f1d6e0c53'
+branch_labels = None
+depends_on = None
+
+
+ISO_TABLES = ['companies', 'qms_types', 'applications', 'documents']
+
+
+def upgrade():
+    # gen_random_uuid() is only built in from Postgres 13
+    op.execute("CREATE EXTENSION IF NOT EXISTS pgcrypto")
+    for table in ISO_TABLES:
+        op.alter_column(table, 'id', server_default=sa.text('gen_random_uuid()'))
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_item_owner_id',
+            'item',
+            ['owner_id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_item_owner_id',
+            table_name='item',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+    for table in ISO_TABLES:
+        op.alter_column(table, 'id', server_default=None)
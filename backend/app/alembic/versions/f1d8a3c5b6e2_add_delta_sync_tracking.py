@@ -0,0 +1,103 @@
+"""Add delta sync tracking
+
+Revision ID: f1d8a3c5b6e2
+Revises: c6a4e2b9f713
+Create Date: 2026-10-19 16:48:52.630417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1d8a3c5b6e2'
+down_revision = 'c6a4e2b9f713'
+branch_labels = None
+depends_on = None
+
+# Tables gaining an updated_at column, set on insert and update by a trigger
+# so every timestamp comes from the database clock
+NEW_UPDATED_AT_TABLES = ['companies', 'user', 'item']
+# Tables served by the changes endpoints, with the column scoping their
+# tombstones to an owner
+TOMBSTONE_TABLES = {'applications': None, 'companies': None, 'item': 'owner_id'}
+
+
+def upgrade():
+    for table in NEW_UPDATED_AT_TABLES:
+        op.add_column(
+            table,
+            sa.Column(
+                'updated_at',
+                sa.DateTime(timezone=True),
+                nullable=False,
+                server_default=sa.text('now()'),
+            ),
+        )
+        # update_updated_at_column() comes from the ISO certification tables
+        op.execute(f'''
+            CREATE TRIGGER set_updated_at BEFORE INSERT OR UPDATE ON "{table}"
+            FOR EACH ROW EXECUTE FUNCTION update_updated_at_column()
+        ''')
+    for table in [*NEW_UPDATED_AT_TABLES, 'applications']:
+        op.create_index(f'ix_{table}_updated_at_id', table, ['updated_at', 'id'])
+
+    op.create_table(
+        'tombstone',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('table_name', sqlmodel.sql.sqltypes.AutoString(length=63), nullable=False),
+        sa.Column('record_id', sa.Uuid(), nullable=False),
+        sa.Column('owner_id', sa.Uuid(), nullable=True),
+        sa.Column(
+            'deleted_at',
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text('now()'),
+        ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_tombstone_table_name_deleted_at_id',
+        'tombstone',
+        ['table_name', 'deleted_at', 'id'],
+    )
+    op.create_index(op.f('ix_tombstone_deleted_at'), 'tombstone', ['deleted_at'])
+    op.create_index(op.f('ix_tombstone_owner_id'), 'tombstone', ['owner_id'])
+    # Statement level, so purges and bulk deletes record their rows in a
+    # single INSERT. The optional argument names the owner column.
+    op.execute('''
+        CREATE FUNCTION record_tombstones() RETURNS trigger AS $$
+        BEGIN
+            EXECUTE format(
+                'INSERT INTO tombstone (table_name, record_id, owner_id) '
+                'SELECT %L, id, %s FROM old_rows',
+                TG_TABLE_NAME,
+                coalesce(quote_ident(TG_ARGV[0]), 'NULL::uuid')
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+    for table, owner_column in TOMBSTONE_TABLES.items():
+        argument = f"'{owner_column}'" if owner_column else ''
+        op.execute(f'''
+            CREATE TRIGGER record_tombstones AFTER DELETE ON "{table}"
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION record_tombstones({argument})
+        ''')
+
+
+def downgrade():
+    for table in TOMBSTONE_TABLES:
+        op.execute(f'DROP TRIGGER record_tombstones ON "{table}"')
+    op.execute('DROP FUNCTION record_tombstones()')
+    op.drop_index(op.f('ix_tombstone_owner_id'), table_name='tombstone')
+    op.drop_index(op.f('ix_tombstone_deleted_at'), table_name='tombstone')
+    op.drop_index('ix_tombstone_table_name_deleted_at_id', table_name='tombstone')
+    op.drop_table('tombstone')
+    for table in ['applications', *NEW_UPDATED_AT_TABLES]:
+        op.drop_index(f'ix_{table}_updated_at_id', table_name=table)
+    for table in NEW_UPDATED_AT_TABLES:
+        op.execute(f'DROP TRIGGER set_updated_at ON "{table}"')
+        op.drop_column(table, 'updated_at')
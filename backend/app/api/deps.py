@@ -1,16 +1,29 @@
+import hashlib
+import time
+import uuid
 from collections.abc import Generator
 from typing import Annotated
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
 from sqlmodel import Session
 
 from app.core import security
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.core.db import engine
+from app.core.principals import (
+    Principal,
+    cache_principal,
+    get_cached_principal,
+    get_cached_token_version,
+    principal_generation,
+)
+from app.core.ratelimit import MemoryBucketStore, PostgresBucketStore, RateLimiter
+from app.core.revocation import revoked_sessions
 from app.models import TokenPayload, User
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -19,15 +32,43 @@ reusable_oauth2 = OAuth2PasswordBearer(
 
 
 def get_db() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+    # Objects keep their state after commit, so responses are serialized without
+    # reloading them. Values generated by the database are fetched with
+    # RETURNING on the INSERT/UPDATE itself (eager_defaults) instead.
+    with Session(engine, expire_on_commit=False) as session:
         yield session
 
 
 SessionDep = Annotated[Session, Depends(get_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
+rate_limiter = RateLimiter(
+    PostgresBucketStore(engine)
+    if settings.RATE_LIMIT_STORE == "postgres"
+    else MemoryBucketStore()
+)
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
+
+def get_client_ip(request: Request) -> str | None:
+    # Behind a proxy this is the address it forwards, if uvicorn trusts it,
+    # see FORWARDED_ALLOW_IPS in docker-compose.yml
+    return request.client.host if request.client else None
+
+
+ClientIP = Annotated[str | None, Depends(get_client_ip)]
+
+# Payloads of access tokens whose signature was verified, by SHA-256 of the
+# token. A client sends the same token with every request until it expires.
+verified_tokens: TTLCache[bytes, TokenPayload] = TTLCache(
+    maxsize=settings.TOKEN_CACHE_MAX_SIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS
+)
+
+
+def _verify_token(token: str) -> TokenPayload:
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = verified_tokens.get(key)
+    if token_data is not None:
+        return token_data
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -38,9 +79,49 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
+    expires_in = payload["exp"] - time.time() if "exp" in payload else None
+    verified_tokens.set(key, token_data, ttl=expires_in)
+    return token_data
+
+
+def _decode_token(token: str) -> tuple[uuid.UUID, TokenPayload]:
+    token_data = _verify_token(token)
+    if token_data.sub is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+    return token_data.sub, token_data
+
+
+def _authenticate(session: Session, token: str) -> tuple[uuid.UUID, TokenPayload]:
+    user_id, token_data = _decode_token(token)
+    if token_data.sid and revoked_sessions.is_revoked(session, token_data.sid):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Token has been revoked",
+        )
+    return user_id, token_data
+
+
+def _get_user(session: Session, user_id: uuid.UUID) -> User:
+    # Loaded already when a route depends on both the principal and the user
+    user = session.identity_map.get(session.identity_key(User, user_id))
+    if isinstance(user, User):
+        return user
+    user = get_cached_principal(session, user_id)
     if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+        generation = principal_generation(user_id)
+        user = session.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        cache_principal(user, generation)
+    return user
+
+
+def get_current_user(session: SessionDep, token: TokenDep) -> User:
+    user_id, _ = _authenticate(session, token)
+    user = _get_user(session, user_id)
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return user
@@ -49,9 +130,43 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
-def get_current_active_superuser(current_user: CurrentUser) -> User:
-    if not current_user.is_superuser:
+def get_current_principal(session: SessionDep, token: TokenDep) -> Principal:
+    """
+    The authenticated user's id and permissions, for endpoints that need
+    nothing else. With STATELESS_AUTH they come from the token's claims and
+    only its version is checked, against the cache or the user row.
+    """
+    user_id, token_data = _authenticate(session, token)
+    if settings.STATELESS_AUTH and token_data.ver is not None:
+        version = get_cached_token_version(user_id)
+        if version is None:
+            version = _get_user(session, user_id).token_version
+        if token_data.ver != version:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Token has been revoked",
+            )
+        principal = Principal(
+            id=user_id,
+            is_active=bool(token_data.act),
+            is_superuser=bool(token_data.su),
+        )
+    else:
+        principal = Principal.from_user(_get_user(session, user_id))
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return principal
+
+
+CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
+
+# Used by the v1 routers, which only need to know the user is logged in
+get_current_active_user = get_current_principal
+
+
+def get_current_active_superuser(principal: CurrentPrincipal) -> Principal:
+    if not principal.is_superuser:
         raise HTTPException(
             status_code=403, detail="The user doesn't have enough privileges"
         )
-    return current_user
+    return principal
@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+from collections.abc import Iterator
+from enum import Enum
+from typing import Any
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from pydantic_core import to_json, to_jsonable_python
+from sqlalchemy import Select
+from sqlalchemy.orm import InstrumentedAttribute, Session
+
+from app.core.config import settings
+from app.core.db import engine
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def export_columns(
+    model: Any, schema: type[BaseModel]
+) -> list[InstrumentedAttribute[Any]]:
+    """Columns of `model` for the fields of its public `schema`, in order."""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, dict | list):
+        return json.dumps(value)
+    return value
+
+
+def _stream_rows(statement: Select[Any], format: ExportFormat) -> Iterator[bytes]:
+    # The body is sent after the request's session is closed, so the export
+    # reads through its own. yield_per fetches from a server side cursor in
+    # batches, memory use doesn't depend on the number of rows.
+    with Session(engine) as session:
+        result = session.execute(
+            statement.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        if format == ExportFormat.csv:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(result.keys())
+            for partition in result.partitions():
+                for row in partition:
+                    values = to_jsonable_python(tuple(row))
+                    writer.writerow([_csv_value(value) for value in values])
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue().encode()
+        else:
+            for partition in result.partitions():
+                yield b"".join(to_json(row._asdict()) + b"\n" for row in partition)
+
+
+def export_response(
+    statement: Select[Any], *, format: ExportFormat, name: str
+) -> StreamingResponse:
+    """Stream the rows of `statement` as NDJSON or CSV, one batch at a time."""
+    return StreamingResponse(
+        _stream_rows(statement, format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.{format.value}"'
+        },
+    )
@@ -0,0 +1,77 @@
+from collections.abc import Callable, Iterable
+from functools import lru_cache
+from typing import Any
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel, ConfigDict, create_model
+
+
+def _parse_names(value: str, allowed: Iterable[str]) -> list[str]:
+    names = list(dict.fromkeys(n.strip() for n in value.split(",") if n.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=422, detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    return names
+
+
+def sparse_fields(schema: type[BaseModel]) -> Callable[..., list[str] | None]:
+    """
+    Dependency parsing a `fields=` query parameter into field names of
+    `schema`. The id is always included, None means all fields.
+    """
+
+    def dependency(
+        fields: str | None = Query(
+            None,
+            description=(
+                "Comma separated fields to return, e.g. `id,created_at`. "
+                f"Available: {', '.join(schema.model_fields)}"
+            ),
+        ),
+    ) -> list[str] | None:
+        if fields is None:
+            return None
+        names = _parse_names(fields, schema.model_fields)
+        if "id" in schema.model_fields and "id" not in names:
+            names.insert(0, "id")
+        return names
+
+    return dependency
+
+
+def expansions(*relationships: str) -> Callable[..., list[str]]:
+    """Dependency parsing an `expand=` query parameter into `relationships`."""
+
+    def dependency(
+        expand: str = Query(
+            "",
+            description=(
+                "Comma separated related objects to embed. "
+                f"Available: {', '.join(relationships)}"
+            ),
+        ),
+    ) -> list[str]:
+        return _parse_names(expand, relationships)
+
+    return dependency
+
+
+@lru_cache(maxsize=256)
+def partial_model(schema: type[BaseModel], fields: tuple[str, ...]) -> type[BaseModel]:
+    """A copy of `schema` reduced to `fields`, built once per combination."""
+    return create_model(  # type: ignore[call-overload, no-any-return]
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{
+            name: (schema.model_fields[name].annotation, schema.model_fields[name])
+            for name in fields
+        },
+    )
+
+
+def dump_fields(schema: type[BaseModel], fields: list[str], obj: Any) -> dict[str, Any]:
+    """Serialize only `fields` of `obj` as `schema` would."""
+    model = partial_model(schema, tuple(fields))
+    return model.model_validate(obj).model_dump(mode="json")
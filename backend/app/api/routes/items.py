@@ -1,35 +1,45 @@
 import uuid
-from typing import Any
+from typing import Annotated, Any
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
+from fastapi import APIRouter, Body, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlmodel import col, select
 
-from app.api.deps import CurrentUser, SessionDep
-from app.models import Item, ItemCreate, ItemPublic, ItemsPublic, ItemUpdate, Message
+from app import crud
+from app.api.deps import CurrentPrincipal, SessionDep
+from app.api.export import ExportFormat, export_columns, export_response
+from app.api.sync import get_changes
+from app.core.config import settings
+from app.models import (
+    Item,
+    ItemCreate,
+    ItemPublic,
+    ItemsBulkPublic,
+    ItemsChangesPublic,
+    ItemsPublic,
+    ItemUpdate,
+    Message,
+)
+from app.utils import validate_rows
 
 router = APIRouter(prefix="/items", tags=["items"])
 
 
 @router.get("/", response_model=ItemsPublic)
 def read_items(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep, current_user: CurrentPrincipal, skip: int = 0, limit: int = 100
 ) -> Any:
     """
     Retrieve items.
     """
 
+    # Counts come from the trigger maintained counters, not a COUNT(*)
     if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(Item)
-        count = session.exec(count_statement).one()
+        count = crud.get_item_count(session=session)
         statement = select(Item).offset(skip).limit(limit)
         items = session.exec(statement).all()
     else:
-        count_statement = (
-            select(func.count())
-            .select_from(Item)
-            .where(Item.owner_id == current_user.id)
-        )
-        count = session.exec(count_statement).one()
+        count = crud.get_item_count(session=session, owner_id=current_user.id)
         statement = (
             select(Item)
             .where(Item.owner_id == current_user.id)
@@ -41,8 +51,52 @@ def read_items(
     return ItemsPublic(data=items, count=count)
 
 
+@router.get("/changes", response_model=ItemsChangesPublic)
+def read_item_changes(
+    session: SessionDep,
+    current_user: CurrentPrincipal,
+    changes_since: str | None = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+) -> Any:
+    """
+    Retrieve items changed or deleted since `changes_since`.
+    """
+    if current_user.is_superuser:
+        changes = get_changes(session, Item, changes_since=changes_since, limit=limit)
+    else:
+        changes = get_changes(
+            session,
+            Item,
+            changes_since=changes_since,
+            limit=limit,
+            filters=[col(Item.owner_id) == current_user.id],
+            owner_id=current_user.id,
+        )
+    return ItemsChangesPublic(
+        data=changes.changed,
+        deleted=changes.deleted,
+        sync_token=changes.sync_token,
+        has_more=changes.has_more,
+    )
+
+
+@router.get("/export")
+def export_items(
+    current_user: CurrentPrincipal, format: ExportFormat = ExportFormat.ndjson
+) -> StreamingResponse:
+    """
+    Export items as NDJSON or CSV, streamed in a single response.
+    """
+    statement = select(*export_columns(Item, ItemPublic))
+    if not current_user.is_superuser:
+        statement = statement.where(Item.owner_id == current_user.id)
+    return export_response(statement, format=format, name="items")
+
+
 @router.get("/{id}", response_model=ItemPublic)
-def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) -> Any:
+def read_item(
+    session: SessionDep, current_user: CurrentPrincipal, id: uuid.UUID
+) -> Any:
     """
     Get item by ID.
     """
@@ -56,7 +110,7 @@ def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) ->
 
 @router.post("/", response_model=ItemPublic)
 def create_item(
-    *, session: SessionDep, current_user: CurrentUser, item_in: ItemCreate
+    *, session: SessionDep, current_user: CurrentPrincipal, item_in: ItemCreate
 ) -> Any:
     """
     Create new item.
@@ -64,15 +118,38 @@ def create_item(
     item = Item.model_validate(item_in, update={"owner_id": current_user.id})
     session.add(item)
     session.commit()
-    session.refresh(item)
     return item
 
 
+@router.post("/bulk", response_model=ItemsBulkPublic)
+def create_items(
+    *,
+    session: SessionDep,
+    current_user: CurrentPrincipal,
+    items_in: Annotated[
+        list[dict[str, Any]], Body(max_length=settings.BULK_CREATE_MAX_ROWS)
+    ],
+) -> Any:
+    """
+    Create items in bulk.
+
+    Invalid rows are reported in `errors` by their index in the payload, the
+    valid ones are created in a single transaction.
+    """
+    valid, errors = validate_rows(items_in, ItemCreate)
+    items = crud.create_items(
+        session=session,
+        items_in=[item_in for _, item_in in valid],
+        owner_id=current_user.id,
+    )
+    return ItemsBulkPublic(data=items, errors=errors)
+
+
 @router.put("/{id}", response_model=ItemPublic)
 def update_item(
     *,
     session: SessionDep,
-    current_user: CurrentUser,
+    current_user: CurrentPrincipal,
     id: uuid.UUID,
     item_in: ItemUpdate,
 ) -> Any:
@@ -88,13 +165,12 @@ def update_item(
     item.sqlmodel_update(update_dict)
     session.add(item)
     session.commit()
-    session.refresh(item)
     return item
 
 
 @router.delete("/{id}")
 def delete_item(
-    session: SessionDep, current_user: CurrentUser, id: uuid.UUID
+    session: SessionDep, current_user: CurrentPrincipal, id: uuid.UUID
 ) -> Message:
     """
     Delete an item.
@@ -1,33 +1,68 @@
+import logging
+import uuid
 from datetime import timedelta
 from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from fastapi.responses import HTMLResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlmodel import Session
 
 from app import crud
-from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app.api.deps import (
+    ClientIP,
+    CurrentUser,
+    SessionDep,
+    get_current_active_superuser,
+    rate_limiter,
+)
 from app.core import security
 from app.core.config import settings
-from app.core.security import get_password_hash
-from app.models import Message, NewPassword, Token, UserPublic
+from app.core.db import engine
+from app.core.principals import invalidate_principal
+from app.core.security import PasswordHashingBusy, get_password_hash
+from app.models import (
+    Message,
+    NewPassword,
+    RefreshTokenRequest,
+    Token,
+    User,
+    UserPublic,
+)
 from app.utils import (
     generate_password_reset_token,
     generate_reset_password_email,
-    send_email,
     verify_password_reset_token,
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(tags=["login"])
 
 
+def rehash_password(user_id: uuid.UUID, old_hash: str, password: str) -> None:
+    """Upgrade an outdated password hash after the response is sent."""
+    with Session(engine) as session:
+        try:
+            crud.rehash_password(
+                session=session, user_id=user_id, old_hash=old_hash, password=password
+            )
+        except PasswordHashingBusy:
+            # Logins are more important, the next one retries
+            logger.info(f"Skipped rehashing the password of user {user_id}")
+
+
 @router.post("/login/access-token")
 def login_access_token(
-    session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+    session: SessionDep,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+    background_tasks: BackgroundTasks,
+    ip: ClientIP,
 ) -> Token:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
+    rate_limiter.check("login", ip=ip, account=form_data.username)
     user = crud.authenticate(
         session=session, email=form_data.username, password=form_data.password
     )
@@ -35,14 +70,59 @@ def login_access_token(
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    if security.password_needs_rehash(user.hashed_password):
+        background_tasks.add_task(
+            rehash_password, user.id, user.hashed_password, form_data.password
+        )
+    return _issue_tokens(session, user)
+
+
+def _issue_tokens(
+    session: Session, user: User, family_id: uuid.UUID | None = None
+) -> Token:
+    refresh_token, family_id = crud.create_refresh_token(
+        session=session, user=user, family_id=family_id
+    )
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims: dict[str, Any] = {"sid": str(family_id)}
+    if settings.STATELESS_AUTH:
+        claims |= {
+            "act": user.is_active,
+            "su": user.is_superuser,
+            "ver": user.token_version,
+        }
     return Token(
         access_token=security.create_access_token(
-            user.id, expires_delta=access_token_expires
-        )
+            user.id, expires_delta=access_token_expires, claims=claims
+        ),
+        refresh_token=refresh_token,
     )
 
 
+@router.post("/login/refresh")
+def refresh_access_token(session: SessionDep, body: RefreshTokenRequest) -> Token:
+    """
+    Exchange a refresh token for a new access token and refresh token, the
+    refresh token can't be used again
+    """
+    db_token = crud.use_refresh_token(session=session, token=body.refresh_token)
+    if not db_token:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    user = session.get(User, db_token.user_id)
+    assert user
+    return _issue_tokens(session, user, family_id=db_token.family_id)
+
+
+@router.post("/logout")
+def logout(session: SessionDep, body: RefreshTokenRequest) -> Message:
+    """
+    Revoke a refresh token, the ones issued after it and their access tokens
+    """
+    if not crud.revoke_refresh_token(session=session, token=body.refresh_token):
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return Message(message="Logged out")
+
+
 @router.post("/login/test-token", response_model=UserPublic)
 def test_token(current_user: CurrentUser) -> Any:
     """
@@ -52,10 +132,11 @@ def test_token(current_user: CurrentUser) -> Any:
 
 
 @router.post("/password-recovery/{email}")
-def recover_password(email: str, session: SessionDep) -> Message:
+def recover_password(email: str, session: SessionDep, ip: ClientIP) -> Message:
     """
     Password Recovery
     """
+    rate_limiter.check("password_recovery", ip=ip, account=email)
     user = crud.get_user_by_email(session=session, email=email)
 
     if not user:
@@ -67,11 +148,13 @@ def recover_password(email: str, session: SessionDep) -> Message:
     email_data = generate_reset_password_email(
         email_to=user.email, email=email, token=password_reset_token
     )
-    send_email(
+    crud.enqueue_email(
+        session=session,
         email_to=user.email,
         subject=email_data.subject,
         html_content=email_data.html_content,
     )
+    session.commit()
     return Message(message="Password recovery email sent")
 
 
@@ -94,6 +177,7 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
     hashed_password = get_password_hash(password=body.new_password)
     user.hashed_password = hashed_password
     session.add(user)
+    invalidate_principal(session, user.id)
     session.commit()
     return Message(message="Password updated successfully")
 
@@ -1,34 +1,65 @@
 import uuid
-from typing import Any
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import col, delete, func, select
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import exists
+from sqlmodel import Session, col, func, select
 
 from app import crud
 from app.api.deps import (
+    ClientIP,
     CurrentUser,
     SessionDep,
     get_current_active_superuser,
+    rate_limiter,
 )
+from app.api.export import ExportFormat, export_columns, export_response
 from app.core.config import settings
+from app.core.db import engine
+from app.core.principals import invalidate_principal
 from app.core.security import get_password_hash, verify_password
 from app.models import (
-    Item,
     Message,
+    NotificationBatchPublic,
+    NotificationCreate,
     UpdatePassword,
     User,
     UserCreate,
+    UserDeleted,
     UserPublic,
+    UserPurge,
+    UserPurgePublic,
     UserRegister,
+    UsersBatchPublic,
     UsersPublic,
     UserUpdate,
     UserUpdateMe,
 )
-from app.utils import generate_new_account_email, send_email
+from app.utils import generate_new_account_email, generate_notification_emails
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
+def run_user_purge(purge_id: uuid.UUID) -> None:
+    # Runs after the response is sent, so it needs its own session
+    with Session(engine) as session:
+        purge = session.get(UserPurge, purge_id)
+        if purge:
+            crud.purge_user(
+                session=session,
+                purge=purge,
+                batch_size=settings.USER_PURGE_BATCH_SIZE,
+            )
+
+
+def _being_purged() -> Any:
+    # Users being purged are hidden as soon as the deletion is requested
+    return exists().where(
+        col(UserPurge.user_id) == User.id, col(UserPurge.finished_at).is_(None)
+    )
+
+
 @router.get(
     "/",
     dependencies=[Depends(get_current_active_superuser)],
@@ -39,15 +70,25 @@ def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
     Retrieve users.
     """
 
-    count_statement = select(func.count()).select_from(User)
+    being_purged = _being_purged()
+    count_statement = select(func.count()).select_from(User).where(~being_purged)
     count = session.exec(count_statement).one()
 
-    statement = select(User).offset(skip).limit(limit)
+    statement = select(User).where(~being_purged).offset(skip).limit(limit)
     users = session.exec(statement).all()
 
     return UsersPublic(data=users, count=count)
 
 
+@router.get("/export", dependencies=[Depends(get_current_active_superuser)])
+def export_users(format: ExportFormat = ExportFormat.ndjson) -> StreamingResponse:
+    """
+    Export all users as NDJSON or CSV, streamed in a single response.
+    """
+    statement = select(*export_columns(User, UserPublic)).where(~_being_purged())
+    return export_response(statement, format=format, name="users")
+
+
 @router.post(
     "/", dependencies=[Depends(get_current_active_superuser)], response_model=UserPublic
 )
@@ -62,16 +103,18 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
             detail="The user with this email already exists in the system.",
         )
 
-    user = crud.create_user(session=session, user_create=user_in)
     if settings.emails_enabled and user_in.email:
         email_data = generate_new_account_email(
-            email_to=user_in.email, username=user_in.email, password=user_in.password
+            email_to=user_in.email, username=user_in.email
         )
-        send_email(
+        # Committed along with the user
+        crud.enqueue_email(
+            session=session,
             email_to=user_in.email,
             subject=email_data.subject,
             html_content=email_data.html_content,
         )
+    user = crud.create_user(session=session, user_create=user_in)
     return user
 
 
@@ -92,8 +135,8 @@ def update_user_me(
     user_data = user_in.model_dump(exclude_unset=True)
     current_user.sqlmodel_update(user_data)
     session.add(current_user)
+    invalidate_principal(session, current_user.id)
     session.commit()
-    session.refresh(current_user)
     return current_user
 
 
@@ -113,6 +156,7 @@ def update_password_me(
     hashed_password = get_password_hash(body.new_password)
     current_user.hashed_password = hashed_password
     session.add(current_user)
+    invalidate_principal(session, current_user.id)
     session.commit()
     return Message(message="Password updated successfully")
 
@@ -125,27 +169,32 @@ def read_user_me(current_user: CurrentUser) -> Any:
     return current_user
 
 
-@router.delete("/me", response_model=Message)
-def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
+@router.delete("/me", response_model=UserDeleted)
+def delete_user_me(
+    session: SessionDep, current_user: CurrentUser, background_tasks: BackgroundTasks
+) -> Any:
     """
     Delete own user.
+
+    The user is deactivated right away, its items and the user itself are
+    deleted in the background.
     """
     if current_user.is_superuser:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    statement = delete(Item).where(col(Item.owner_id) == current_user.id)
-    session.exec(statement)  # type: ignore
-    session.delete(current_user)
-    session.commit()
-    return Message(message="User deleted successfully")
+    purge, run = crud.get_or_create_user_purge(session=session, db_user=current_user)
+    if run:
+        background_tasks.add_task(run_user_purge, purge.id)
+    return UserDeleted(message="User deleted successfully", purge_id=purge.id)
 
 
 @router.post("/signup", response_model=UserPublic)
-def register_user(session: SessionDep, user_in: UserRegister) -> Any:
+def register_user(session: SessionDep, user_in: UserRegister, ip: ClientIP) -> Any:
     """
     Create new user without the need to be logged in.
     """
+    rate_limiter.check("signup", ip=ip, account=user_in.email)
     user = crud.get_user_by_email(session=session, email=user_in.email)
     if user:
         raise HTTPException(
@@ -157,6 +206,50 @@ def register_user(session: SessionDep, user_in: UserRegister) -> Any:
     return user
 
 
+@router.get(
+    "/batch",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=UsersBatchPublic,
+)
+def read_users_batch(
+    session: SessionDep,
+    ids: Annotated[
+        list[uuid.UUID],
+        Query(min_length=1, max_length=settings.BATCH_GET_MAX_IDS),
+    ],
+) -> Any:
+    """
+    Get users by id in one request, keyed by id. Unknown ids map to null.
+    """
+    return UsersBatchPublic(data=crud.get_by_ids(db=session, model=User, ids=ids))
+
+
+@router.post(
+    "/notify",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=NotificationBatchPublic,
+)
+def notify_users(session: SessionDep, notification: NotificationCreate) -> Any:
+    """
+    Email a notification to every active user. Track its delivery with
+    /utils/notifications/{batch_id}.
+    """
+    statement = select(User.email, User.full_name).where(col(User.is_active))
+    emails = generate_notification_emails(
+        subject=notification.subject,
+        message=notification.message,
+        recipients=session.exec(statement),
+    )
+    batch_id, count = crud.enqueue_email_batch(
+        session=session,
+        emails=(
+            (email_to, email_data.subject, email_data.html_content)
+            for email_to, email_data in emails
+        ),
+    )
+    return NotificationBatchPublic(batch_id=batch_id, recipients=count)
+
+
 @router.get("/{user_id}", response_model=UserPublic)
 def read_user_by_id(
     user_id: uuid.UUID, session: SessionDep, current_user: CurrentUser
@@ -209,10 +302,16 @@ def update_user(
 
 @router.delete("/{user_id}", dependencies=[Depends(get_current_active_superuser)])
 def delete_user(
-    session: SessionDep, current_user: CurrentUser, user_id: uuid.UUID
-) -> Message:
+    session: SessionDep,
+    current_user: CurrentUser,
+    user_id: uuid.UUID,
+    background_tasks: BackgroundTasks,
+) -> UserDeleted:
     """
     Delete a user.
+
+    The user is deactivated right away, its items and the user itself are
+    deleted in the background. Progress is reported by `/users/purges/{id}`.
     """
     user = session.get(User, user_id)
     if not user:
@@ -221,8 +320,24 @@ def delete_user(
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    statement = delete(Item).where(col(Item.owner_id) == user_id)
-    session.exec(statement)  # type: ignore
-    session.delete(user)
-    session.commit()
-    return Message(message="User deleted successfully")
+    # Deleting a user again while it's being purged returns the same purge,
+    # and resumes it if it looks interrupted
+    purge, run = crud.get_or_create_user_purge(session=session, db_user=user)
+    if run:
+        background_tasks.add_task(run_user_purge, purge.id)
+    return UserDeleted(message="User deleted successfully", purge_id=purge.id)
+
+
+@router.get(
+    "/purges/{purge_id}",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=UserPurgePublic,
+)
+def read_user_purge(session: SessionDep, purge_id: uuid.UUID) -> Any:
+    """
+    Get the progress of a user deletion.
+    """
+    purge = session.get(UserPurge, purge_id)
+    if not purge:
+        raise HTTPException(status_code=404, detail="User deletion not found")
+    return purge
@@ -1,9 +1,19 @@
-from fastapi import APIRouter, Depends
+import uuid
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic.networks import EmailStr
 
-from app.api.deps import get_current_active_superuser
-from app.models import Message
-from app.utils import generate_test_email, send_email
+from app import crud
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.core import metrics
+from app.models import (
+    Message,
+    NotificationBatchStatusPublic,
+    NotificationRecipientPublic,
+)
+from app.utils import generate_test_email
 
 router = APIRouter(prefix="/utils", tags=["utils"])
 
@@ -13,19 +23,71 @@ router = APIRouter(prefix="/utils", tags=["utils"])
     dependencies=[Depends(get_current_active_superuser)],
     status_code=201,
 )
-def test_email(email_to: EmailStr) -> Message:
+def test_email(session: SessionDep, email_to: EmailStr) -> Message:
     """
     Test emails.
     """
     email_data = generate_test_email(email_to=email_to)
-    send_email(
+    crud.enqueue_email(
+        session=session,
         email_to=email_to,
         subject=email_data.subject,
         html_content=email_data.html_content,
     )
+    session.commit()
     return Message(message="Test email sent")
 
 
+@router.get(
+    "/notifications/{batch_id}",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=NotificationBatchStatusPublic,
+)
+def read_notification_batch(
+    session: SessionDep, batch_id: uuid.UUID, skip: int = 0, limit: int = 100
+) -> Any:
+    """
+    Delivery of a bulk notification, overall and by recipient.
+    """
+    counts = crud.get_email_batch_counts(session=session, batch_id=batch_id)
+    if not counts:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    created_at = min(created_at for _, created_at, _ in counts.values())
+    sent, _, last_sent_at = counts.get("sent", (0, created_at, None))
+    throughput = None
+    if last_sent_at and last_sent_at > created_at:
+        throughput = sent / (last_sent_at - created_at).total_seconds()
+    recipients = crud.get_email_batch_recipients(
+        session=session, batch_id=batch_id, skip=skip, limit=limit
+    )
+    return NotificationBatchStatusPublic(
+        batch_id=batch_id,
+        total=sum(count for count, _, _ in counts.values()),
+        pending=counts.get("pending", (0,))[0],
+        sent=sent,
+        failed=counts.get("failed", (0,))[0],
+        created_at=created_at,
+        last_sent_at=last_sent_at,
+        throughput=throughput,
+        recipients=[
+            NotificationRecipientPublic.model_validate(email, from_attributes=True)
+            for email in recipients
+        ],
+    )
+
+
+@router.get(
+    "/metrics/",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_class=PlainTextResponse,
+)
+def read_metrics() -> str:
+    """
+    Metrics of this worker process in the Prometheus text format.
+    """
+    return metrics.render()
+
+
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
@@ -0,0 +1,119 @@
+import base64
+import binascii
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import settings
+
+
+@dataclass
+class SyncPosition:
+    # Keyset positions in the changed rows and in the tombstones
+    updated: tuple[datetime, uuid.UUID] | None
+    deleted: tuple[datetime, int]
+
+
+@dataclass
+class ChangeSet:
+    changed: list[Any]
+    deleted: list[uuid.UUID]
+    sync_token: str
+    has_more: bool
+
+
+def encode_sync_token(position: SyncPosition) -> str:
+    data = {
+        "u": [position.updated[0].isoformat(), str(position.updated[1])]
+        if position.updated
+        else None,
+        "d": [position.deleted[0].isoformat(), position.deleted[1]],
+    }
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def decode_sync_token(token: str) -> SyncPosition:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()))
+        updated = (
+            (datetime.fromisoformat(data["u"][0]), uuid.UUID(data["u"][1]))
+            if data["u"]
+            else None
+        )
+        deleted = (datetime.fromisoformat(data["d"][0]), int(data["d"][1]))
+        # Naive datetimes can't be compared with the database's aware ones
+        if deleted[0].tzinfo is None or (updated and updated[0].tzinfo is None):
+            raise ValueError("Sync token datetimes must have a timezone")
+    except (binascii.Error, ValueError, KeyError, IndexError, TypeError):
+        raise HTTPException(status_code=422, detail="Invalid sync token")
+    return SyncPosition(updated=updated, deleted=deleted)
+
+
+def get_changes(
+    session: Session,
+    model: Any,
+    *,
+    changes_since: str | None,
+    limit: int,
+    filters: list[Any] | None = None,
+    owner_id: uuid.UUID | None = None,
+) -> ChangeSet:
+    """
+    Rows of `model` changed and ids deleted since the position in
+    `changes_since`, with the token to pass on the next call. Without a token
+    every row is returned, paged by `limit`, and no deletions. A row may be sent
+    again, clients apply changes as upserts and call again while `has_more`.
+    """
+    horizon = crud.get_sync_horizon(
+        session=session,
+        window=timedelta(seconds=settings.SYNC_SAFETY_WINDOW_SECONDS),
+    )
+    if changes_since is None:
+        position = SyncPosition(updated=None, deleted=(horizon, 0))
+        tombstones = []
+    else:
+        position = decode_sync_token(changes_since)
+        retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        if position.deleted[0] < datetime.now(timezone.utc) - retention:
+            raise HTTPException(
+                status_code=410,
+                detail="Sync token expired, start over without changes_since",
+            )
+        tombstones = crud.get_tombstones(
+            session=session,
+            table_name=model.__tablename__,
+            after=position.deleted,
+            horizon=horizon,
+            limit=limit,
+            owner_id=owner_id,
+        )
+
+    changed = crud.get_changed(
+        session=session,
+        model=model,
+        after=position.updated,
+        horizon=horizon,
+        limit=limit,
+        filters=filters or [],
+    )
+    if changed:
+        position.updated = (changed[-1].updated_at, changed[-1].id)
+    if len(tombstones) == limit:
+        last = tombstones[-1]
+        assert last.id is not None
+        position.deleted = (last.deleted_at, last.id)
+    else:
+        # Every tombstone before the horizon has been read
+        position.deleted = (horizon, 0)
+    return ChangeSet(
+        changed=changed,
+        deleted=[tombstone.record_id for tombstone in tombstones],
+        sync_token=encode_sync_token(position),
+        has_more=len(changed) == limit or len(tombstones) == limit,
+    )
@@ -1,22 +1,37 @@
 from typing import Any
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app import crud, models, schemas
 from app.api import deps
+from app.api.export import ExportFormat, export_columns, export_response
+from app.api.fieldsets import dump_fields, expansions, sparse_fields
+from app.api.sync import get_changes
 from app.core.config import settings
+from app.core.principals import Principal
+from app.core.form_filters import FilterError, compile_filter
+from app.models import BulkRowError
+from app.utils import validate_rows
 from app.utils.document_generator import generate_document
 import os
 
 router = APIRouter()
 
+APPLICATION_FIELDS = sparse_fields(schemas.Application)
+APPLICATION_EXPANSIONS = expansions("company", "qms_type")
+
+def _response_fields(fields: list[str] | None, expand: list[str]) -> list[str]:
+    # Selected (or all) application fields followed by the expanded relationships
+    return [*(fields or schemas.Application.model_fields), *expand]
+
 @router.post("/", response_model=schemas.Application)
 def create_application(
     *,
     db: Session = Depends(deps.get_db),
     application_in: schemas.ApplicationCreate,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_active_user),
 ) -> Any:
     """Create new application."""
     # Verify company and QMS type exist
@@ -31,29 +46,124 @@ def create_application(
     application = crud.create_application(db=db, application_data=application_in.model_dump())
     return application
 
+@router.post("/bulk", response_model=schemas.ApplicationBulkResult)
+def create_applications(
+    *,
+    db: Session = Depends(deps.get_db),
+    applications_in: list[dict[str, Any]] = Body(..., max_length=settings.BULK_CREATE_MAX_ROWS),
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> Any:
+    """Create applications in bulk, reporting invalid rows instead of aborting."""
+    valid, errors = validate_rows(applications_in, schemas.ApplicationCreate)
+
+    # One lookup per referenced table instead of one per row
+    company_ids = crud.get_existing_ids(
+        db=db, model=models.Company, ids={a.company_id for _, a in valid}
+    )
+    qms_type_ids = crud.get_existing_ids(
+        db=db, model=models.QMSType, ids={a.qms_type_id for _, a in valid}
+    )
+    applications_data = []
+    for index, application_in in valid:
+        if application_in.company_id not in company_ids:
+            errors.append(BulkRowError(index=index, errors=[
+                {"loc": ["company_id"], "msg": "Company not found", "type": "not_found"}
+            ]))
+        elif application_in.qms_type_id not in qms_type_ids:
+            errors.append(BulkRowError(index=index, errors=[
+                {"loc": ["qms_type_id"], "msg": "QMS type not found", "type": "not_found"}
+            ]))
+        else:
+            applications_data.append(application_in.model_dump())
+    errors.sort(key=lambda error: error.index)
+
+    applications = crud.create_applications(db=db, applications_data=applications_data)
+    return {"items": applications, "errors": errors}
+
 @router.get("/", response_model=schemas.ApplicationList)
 def read_applications(
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    form_data: list[str] = Query(
+        [],
+        max_length=20,
+        description="Filters on form data such as `scope=ISO 9001` or `site.count=3`",
+    ),
+    fields: list[str] | None = Depends(APPLICATION_FIELDS),
+    expand: list[str] = Depends(APPLICATION_EXPANSIONS),
+    current_user: Principal = Depends(deps.get_current_active_user),
 ) -> Any:
-    """Retrieve applications."""
-    applications = crud.get_applications(db=db, skip=skip, limit=limit)
+    """
+    Retrieve applications, optionally filtered by values inside their form data.
+
+    With `fields` only those columns are read and returned, e.g.
+    `fields=created_at,updated_at` leaves out the form data. With
+    `expand=company,qms_type` the related objects are embedded, loaded in the
+    same query.
+    """
+    try:
+        filters = [compile_filter(models.Application.form_data, f) for f in form_data]
+    except FilterError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    applications = crud.get_applications(
+        db=db, skip=skip, limit=limit, filters=filters, fields=fields, expand=expand
+    )
     total = len(applications)
+    if fields or expand:
+        names = _response_fields(fields, expand)
+        items = [dump_fields(schemas.ApplicationExpanded, names, a) for a in applications]
+        return JSONResponse({"items": items, "total": total})
     return {"items": applications, "total": total}
 
+@router.get("/export")
+def export_applications(
+    format: ExportFormat = ExportFormat.ndjson,
+    form_data: list[str] = Query(
+        [],
+        max_length=20,
+        description="Filters on form data such as `scope=ISO 9001` or `site.count=3`",
+    ),
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> StreamingResponse:
+    """Export applications as NDJSON or CSV, streamed in a single response."""
+    try:
+        filters = [compile_filter(models.Application.form_data, f) for f in form_data]
+    except FilterError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    statement = select(*export_columns(models.Application, schemas.Application))
+    return export_response(statement.where(*filters), format=format, name="applications")
+
+@router.get("/changes", response_model=schemas.ApplicationChanges)
+def read_application_changes(
+    db: Session = Depends(deps.get_db),
+    changes_since: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Retrieve applications changed or deleted since `changes_since`.
+    """
+    return get_changes(db, models.Application, changes_since=changes_since, limit=limit)
+
 @router.get("/{application_id}", response_model=schemas.Application)
 def read_application(
     *,
     db: Session = Depends(deps.get_db),
     application_id: UUID,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    fields: list[str] | None = Depends(APPLICATION_FIELDS),
+    expand: list[str] = Depends(APPLICATION_EXPANSIONS),
+    current_user: Principal = Depends(deps.get_current_active_user),
 ) -> Any:
-    """Get application by ID."""
-    application = crud.get_application(db=db, application_id=application_id)
+    """Get application by ID, see `read_applications` for `fields` and `expand`."""
+    application = crud.get_application(
+        db=db, application_id=application_id, fields=fields, expand=expand
+    )
     if not application:
         raise HTTPException(status_code=404, detail="Application not found")
+    if fields or expand:
+        names = _response_fields(fields, expand)
+        return JSONResponse(dump_fields(schemas.ApplicationExpanded, names, application))
     return application
 
 @router.post("/{application_id}/generate-documents")
@@ -61,10 +171,10 @@ async def generate_documents(
     *,
     db: Session = Depends(deps.get_db),
     application_id: UUID,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_active_user),
 ) -> Any:
     """Generate documents for application."""
-    application = crud.get_application(db=db, application_id=application_id)
+    application = crud.get_application_with_company(db=db, application_id=application_id)
     if not application:
         raise HTTPException(status_code=404, detail="Application not found")
     
@@ -90,7 +200,7 @@ async def download_document(
     db: Session = Depends(deps.get_db),
     application_id: UUID,
     document_id: UUID,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_active_user),
 ) -> Any:
     """Download generated document."""
     document = crud.get_document(db=db, document_id=document_id)
@@ -1,10 +1,21 @@
+import codecs
+import csv
 from typing import Any
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, UploadFile, File
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app import crud, schemas, models
 from app.api import deps
+from app.api.export import ExportFormat, export_columns, export_response
+from app.api.fieldsets import dump_fields, sparse_fields
+from app.api.sync import get_changes
 from app.core.config import settings
+from app.core.principals import Principal
+from app.models import BulkRowError
+from app.utils import iter_validated_rows, validate_rows
 import os
 
 # Create upload directory if it doesn't exist
@@ -12,46 +23,187 @@ os.makedirs(f"{settings.UPLOADS_DIR}/company_logos", exist_ok=True)
 
 router = APIRouter()
 
+REGISTRATION_NUMBER_TAKEN = "A company with this registration number already exists"
+
 @router.post("/", response_model=schemas.Company)
 def create_company(
     *,
     db: Session = Depends(deps.get_db),
     company_in: schemas.CompanyCreate,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Create new company.
     """
-    company = crud.create_company(db=db, company_data=company_in.model_dump())
+    try:
+        company = crud.create_company(db=db, company_data=company_in.model_dump(mode="json"))
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=REGISTRATION_NUMBER_TAKEN)
     return company
 
+@router.post("/bulk", response_model=schemas.CompanyBulkResult)
+def create_companies(
+    *,
+    db: Session = Depends(deps.get_db),
+    companies_in: list[dict[str, Any]] = Body(..., max_length=settings.BULK_CREATE_MAX_ROWS),
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Create companies in bulk.
+
+    The whole payload is validated first, invalid rows are reported in
+    `errors` by their index and the valid ones are inserted in one transaction.
+    Rows whose registration number is taken are reported in `errors` too.
+    """
+    valid, errors = validate_rows(companies_in, schemas.CompanyCreate)
+    companies = crud.create_companies(
+        db=db,
+        companies_data=[company_in.model_dump(mode="json") for _, company_in in valid],
+    )
+    items = []
+    for (index, _), company in zip(valid, companies, strict=True):
+        if company is None:
+            errors.append(BulkRowError(index=index, errors=[
+                {"loc": ["registration_number"], "msg": REGISTRATION_NUMBER_TAKEN, "type": "conflict"}
+            ]))
+        else:
+            items.append(company)
+    errors.sort(key=lambda error: error.index)
+    return {"items": items, "errors": errors}
+
+@router.post("/import", response_model=schemas.CompanyImportResult)
+def import_companies(
+    *,
+    db: Session = Depends(deps.get_db),
+    file: UploadFile = File(..., description="UTF-8 CSV with a header row"),
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Import companies from a CSV file, upserting on registration number.
+
+    Rows are validated as they are read and invalid ones are reported by their
+    index, header excluded. Empty cells are read as missing values.
+    """
+    # The upload is spooled to disk, it's decoded and parsed line by line
+    reader = csv.DictReader(codecs.iterdecode(file.file, "utf-8-sig"))
+    try:
+        fieldnames = reader.fieldnames or []
+        missing = [
+            name for name, field in schemas.CompanyCreate.model_fields.items()
+            if field.is_required() and name not in fieldnames
+        ]
+        if missing:
+            raise HTTPException(
+                status_code=422, detail=f"Missing columns: {', '.join(missing)}"
+            )
+        rows = ({k: v or None for k, v in row.items() if k} for row in reader)
+        errors: list[BulkRowError] = []
+        error_count = 0
+
+        def valid_companies():
+            nonlocal error_count
+            for _, result in iter_validated_rows(rows, schemas.CompanyCreate):
+                if isinstance(result, BulkRowError):
+                    error_count += 1
+                    if len(errors) < settings.IMPORT_MAX_ERRORS:
+                        errors.append(result)
+                else:
+                    yield result.model_dump(mode="json")
+
+        counts = crud.import_companies(db=db, companies_data=valid_companies())
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid CSV file: {e}")
+    return {**counts, "errors": errors, "error_count": error_count}
+
 @router.get("/", response_model=schemas.CompanyList)
 def read_companies(
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    fields: list[str] | None = Depends(sparse_fields(schemas.Company)),
+    current_user: Principal = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Retrieve companies.
     """
-    companies = crud.get_companies(db=db, skip=skip, limit=limit)
+    companies = crud.get_companies(db=db, skip=skip, limit=limit, fields=fields)
     total = len(companies)  # In production, you'd want to do a COUNT query
+    if fields:
+        items = [dump_fields(schemas.Company, fields, company) for company in companies]
+        return JSONResponse({"items": items, "total": total})
     return {"items": companies, "total": total}
 
+@router.get("/search", response_model=schemas.CompanySearchResults)
+def search_companies(
+    db: Session = Depends(deps.get_db),
+    q: str = Query(..., min_length=1, max_length=100),
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Search companies by name, registration number, contact person and industry.
+
+    Terms match word prefixes and names tolerate typos, best matches first.
+    """
+    # Fetch one extra row to know whether there is a next page without a COUNT
+    companies = crud.search_companies(db=db, query=q, skip=skip, limit=limit + 1)
+    return {"items": companies[:limit], "has_more": len(companies) > limit}
+
+@router.get("/export")
+def export_companies(
+    format: ExportFormat = ExportFormat.ndjson,
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> StreamingResponse:
+    """
+    Export all companies as NDJSON or CSV, streamed in a single response.
+    """
+    statement = select(*export_columns(models.Company, schemas.Company))
+    return export_response(statement, format=format, name="companies")
+
+@router.get("/changes", response_model=schemas.CompanyChanges)
+def read_company_changes(
+    db: Session = Depends(deps.get_db),
+    changes_since: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Retrieve companies changed or deleted since `changes_since`.
+    """
+    return get_changes(db, models.Company, changes_since=changes_since, limit=limit)
+
+@router.get("/batch", response_model=schemas.CompanyBatch)
+def read_companies_batch(
+    *,
+    db: Session = Depends(deps.get_db),
+    ids: list[UUID] = Query(..., min_length=1, max_length=settings.BATCH_GET_MAX_IDS),
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get companies by id in one request, e.g. `?ids=<id>&ids=<id>`.
+
+    Results are keyed by id, ids that don't exist map to null.
+    """
+    return {"items": crud.get_by_ids(db=db, model=models.Company, ids=ids)}
+
 @router.get("/{company_id}", response_model=schemas.Company)
 def read_company(
     *,
     db: Session = Depends(deps.get_db),
     company_id: UUID,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    fields: list[str] | None = Depends(sparse_fields(schemas.Company)),
+    current_user: Principal = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Get company by ID.
     """
-    company = crud.get_company(db=db, company_id=company_id)
+    company = crud.get_company(db=db, company_id=company_id, fields=fields)
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
+    if fields:
+        return JSONResponse(dump_fields(schemas.Company, fields, company))
     return company
 
 @router.put("/{company_id}", response_model=schemas.Company)
@@ -60,17 +212,20 @@ def update_company(
     db: Session = Depends(deps.get_db),
     company_id: UUID,
     company_in: schemas.CompanyUpdate,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Update company.
     """
-    company = crud.get_company(db=db, company_id=company_id)
+    try:
+        company = crud.update_company(
+            db=db, company_id=company_id, company_data=company_in.model_dump(mode="json")
+        )
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=REGISTRATION_NUMBER_TAKEN)
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
-    company = crud.update_company(
-        db=db, company_id=company_id, company_data=company_in.model_dump()
-    )
     return company
 
 @router.delete("/{company_id}")
@@ -78,7 +233,7 @@ def delete_company(
     *,
     db: Session = Depends(deps.get_db),
     company_id: UUID,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Delete company.
@@ -95,7 +250,7 @@ async def upload_company_logo(
     db: Session = Depends(deps.get_db),
     company_id: UUID,
     file: UploadFile = File(...),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Upload company logo.
@@ -1,10 +1,11 @@
 from typing import Any
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
 from sqlalchemy.orm import Session
 from app import crud, models, schemas
 from app.api import deps
 from app.core.config import settings
+from app.core.principals import Principal
 import os
 
 # Create upload directory if it doesn't exist
@@ -19,7 +20,7 @@ async def upload_document(
     qms_type_id: UUID,
     title: str,
     file: UploadFile = File(...),
-    current_user: models.User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """Upload document template."""
     # Verify QMS type exists
@@ -41,12 +42,26 @@ async def upload_document(
     document = crud.create_document(db=db, document_data=document_data)
     return document
 
+@router.get("/batch", response_model=schemas.DocumentBatch)
+def read_documents_batch(
+    *,
+    db: Session = Depends(deps.get_db),
+    ids: list[UUID] = Query(..., min_length=1, max_length=settings.BATCH_GET_MAX_IDS),
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get documents by id in one request, e.g. `?ids=<id>&ids=<id>`.
+
+    Results are keyed by id, ids that don't exist map to null.
+    """
+    return {"items": crud.get_by_ids(db=db, model=models.Document, ids=ids)}
+
 @router.get("/{qms_type_id}", response_model=schemas.DocumentList)
 def read_documents(
     *,
     db: Session = Depends(deps.get_db),
     qms_type_id: UUID,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_active_user),
 ) -> Any:
     """Get all documents for a QMS type."""
     documents = crud.get_documents_by_qms_type(db=db, qms_type_id=qms_type_id)
@@ -58,7 +73,7 @@ def delete_document(
     *,
     db: Session = Depends(deps.get_db),
     document_id: UUID,
-    current_user: models.User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """Delete document."""
     document = crud.get_document(db=db, document_id=document_id)
@@ -1,9 +1,12 @@
 from typing import Any
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app import crud, models, schemas
 from app.api import deps
+from app.core.config import settings
+from app.core.principals import Principal
+from app.utils import generate_notification_emails
 
 router = APIRouter()
 
@@ -12,7 +15,7 @@ def create_qms_type(
     *,
     db: Session = Depends(deps.get_db),
     qms_type_in: schemas.QMSTypeCreate,
-    current_user: models.User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """Create new QMS type."""
     qms_type = crud.create_qms_type(db=db, qms_type_data=qms_type_in.model_dump())
@@ -23,36 +26,79 @@ def read_qms_types(
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_active_user),
 ) -> Any:
     """Retrieve QMS types."""
     qms_types = crud.get_qms_types(db=db, skip=skip, limit=limit)
     total = len(qms_types)
     return {"items": qms_types, "total": total}
 
+@router.get("/batch", response_model=schemas.QMSTypeBatch)
+def read_qms_types_batch(
+    *,
+    db: Session = Depends(deps.get_db),
+    ids: list[UUID] = Query(..., min_length=1, max_length=settings.BATCH_GET_MAX_IDS),
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get qms types by id in one request, e.g. `?ids=<id>&ids=<id>`.
+
+    Results are keyed by id, ids that don't exist map to null.
+    """
+    return {"items": crud.get_by_ids(db=db, model=models.QMSType, ids=ids)}
+
 @router.put("/{qms_type_id}", response_model=schemas.QMSType)
 def update_qms_type(
     *,
     db: Session = Depends(deps.get_db),
     qms_type_id: UUID,
     qms_type_in: schemas.QMSTypeUpdate,
-    current_user: models.User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """Update QMS type."""
-    qms_type = crud.get_qms_type(db=db, qms_type_id=qms_type_id)
-    if not qms_type:
-        raise HTTPException(status_code=404, detail="QMS type not found")
     qms_type = crud.update_qms_type(
         db=db, qms_type_id=qms_type_id, qms_type_data=qms_type_in.model_dump()
     )
+    if not qms_type:
+        raise HTTPException(status_code=404, detail="QMS type not found")
     return qms_type
 
+@router.post("/{qms_type_id}/notify", response_model=models.NotificationBatchPublic)
+def notify_qms_type_applicants(
+    *,
+    db: Session = Depends(deps.get_db),
+    qms_type_id: UUID,
+    notification: models.NotificationCreate,
+    current_user: Principal = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Email a notification to the contact of every company that applied for the
+    QMS type, e.g. when its templates change. Track its delivery with
+    /utils/notifications/{batch_id}.
+    """
+    qms_type = crud.get_qms_type(db=db, qms_type_id=qms_type_id)
+    if not qms_type:
+        raise HTTPException(status_code=404, detail="QMS type not found")
+    emails = generate_notification_emails(
+        subject=notification.subject,
+        message=notification.message,
+        recipients=crud.get_qms_type_applicant_contacts(db=db, qms_type_id=qms_type_id),
+    )
+    batch_id, count = crud.enqueue_email_batch(
+        session=db,
+        emails=(
+            (email_to, email_data.subject, email_data.html_content)
+            for email_to, email_data in emails
+        ),
+    )
+    return {"batch_id": batch_id, "recipients": count}
+
 @router.delete("/{qms_type_id}")
 def delete_qms_type(
     *,
     db: Session = Depends(deps.get_db),
     qms_type_id: UUID,
-    current_user: models.User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """Delete QMS type."""
     qms_type = crud.get_qms_type(db=db, qms_type_id=qms_type_id)
@@ -0,0 +1,77 @@
+"""
+Measure the latency of argon2id password hashes for candidate costs on this
+machine, to pick ARGON2_TIME_COST, ARGON2_MEMORY_COST and ARGON2_PARALLELISM.
+The bcrypt hashes of older accounts are measured for comparison. Logins verify
+one hash, keep in mind PASSWORD_HASH_WORKERS of them run at once. Doesn't need
+a database.
+
+    python -m app.benchmarks.hash_calibration --time-cost 2 3 --memory-cost 19456 65536
+"""
+
+import argparse
+import itertools
+import logging
+import statistics
+import time
+
+from passlib.hash import argon2, bcrypt
+
+from app.core.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PASSWORD = "correct horse battery staple"
+
+
+def _measure(name: str, hasher: type, samples: int) -> None:
+    hashed = hasher.hash(PASSWORD)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.verify(PASSWORD, hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    logger.info(
+        f"{name:>32}: mean {statistics.mean(timings):.1f} ms, "
+        f"p95 {timings[max(int(len(timings) * 0.95) - 1, 0)]:.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Calibrate password hash costs")
+    parser.add_argument(
+        "--time-cost", type=int, nargs="+", default=[settings.ARGON2_TIME_COST]
+    )
+    parser.add_argument(
+        "--memory-cost",
+        type=int,
+        nargs="+",
+        default=[settings.ARGON2_MEMORY_COST],
+        help="KiB",
+    )
+    parser.add_argument(
+        "--parallelism", type=int, nargs="+", default=[settings.ARGON2_PARALLELISM]
+    )
+    parser.add_argument("--samples", type=int, default=20)
+    args = parser.parse_args()
+
+    _measure("bcrypt", bcrypt, args.samples)
+    for time_cost, memory_cost, parallelism in itertools.product(
+        args.time_cost, args.memory_cost, args.parallelism
+    ):
+        hasher = argon2.using(
+            type="ID",
+            time_cost=time_cost,
+            memory_cost=memory_cost,
+            parallelism=parallelism,
+        )
+        _measure(
+            f"argon2id t={time_cost} m={memory_cost} p={parallelism}",
+            hasher,
+            args.samples,
+        )
+
+
+if __name__ == "__main__":
+    main()
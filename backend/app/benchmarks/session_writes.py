@@ -0,0 +1,83 @@
+"""
+Compare the item create path with and without expire_on_commit.
+
+The "refresh" variant is the previous write path: a session with
+expire_on_commit=True, a refresh() after commit and serialization of the
+result. The "no-refresh" variant is the current one, expire_on_commit=False
+and no refresh. Needs a migrated database.
+
+    python -m app.benchmarks.session_writes --rounds 500
+"""
+
+import argparse
+import logging
+import statistics
+import time
+import uuid
+from collections.abc import Callable
+
+from sqlmodel import Session, delete
+
+from app.core.db import engine, track_queries
+from app.models import Item, ItemPublic, User
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _create_with_refresh(owner_id: uuid.UUID) -> None:
+    with Session(engine) as session:
+        item = Item(title="benchmark", owner_id=owner_id)
+        session.add(item)
+        session.commit()
+        session.refresh(item)
+        ItemPublic.model_validate(item)
+
+
+def _create_without_refresh(owner_id: uuid.UUID) -> None:
+    with Session(engine, expire_on_commit=False) as session:
+        item = Item(title="benchmark", owner_id=owner_id)
+        session.add(item)
+        session.commit()
+        ItemPublic.model_validate(item)
+
+
+def _measure(
+    name: str, create: Callable[[uuid.UUID], None], owner_id: uuid.UUID, rounds: int
+) -> None:
+    timings = []
+    with track_queries() as stats:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            create(owner_id)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    logger.info(
+        f"{name:>10}: mean {statistics.mean(timings):.3f} ms, "
+        f"p95 {timings[int(len(timings) * 0.95) - 1]:.3f} ms, "
+        f"{stats.count / rounds:.1f} queries per create"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the item write path")
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        owner = User(email=f"benchmark-{uuid.uuid4()}@example.com", hashed_password="")
+        session.add(owner)
+        session.commit()
+        owner_id = owner.id
+    try:
+        _measure("refresh", _create_with_refresh, owner_id, args.rounds)
+        _measure("no-refresh", _create_without_refresh, owner_id, args.rounds)
+    finally:
+        with Session(engine) as session:
+            session.exec(delete(Item).where(Item.owner_id == owner_id))  # type: ignore
+            session.exec(delete(User).where(User.id == owner_id))  # type: ignore
+            session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compare the access token checks of authenticated requests with and without
+the cache of verified tokens.
+
+The "uncached" variant verifies the signature and validates the payload of
+the token on every request, as before. The "cached" variant is the current
+one, the same token sent again is looked up by its digest. Doesn't need a
+database.
+
+    python -m app.benchmarks.token_auth --rounds 100000
+"""
+
+import argparse
+import logging
+import statistics
+import time
+import uuid
+from collections.abc import Callable
+from datetime import timedelta
+
+from app.api.deps import _decode_token, verified_tokens
+from app.core.config import settings
+from app.core.security import create_access_token
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _decode_uncached(token: str) -> None:
+    verified_tokens.clear()
+    _decode_token(token)
+
+
+def _decode_cached(token: str) -> None:
+    _decode_token(token)
+
+
+def _measure(name: str, decode: Callable[[str], None], token: str, rounds: int) -> None:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        decode(token)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    timings.sort()
+    logger.info(
+        f"{name:>10}: mean {statistics.mean(timings):.1f} µs, "
+        f"p95 {timings[int(len(timings) * 0.95) - 1]:.1f} µs"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark access token checks")
+    parser.add_argument("--rounds", type=int, default=100_000)
+    args = parser.parse_args()
+
+    token = create_access_token(
+        uuid.uuid4(),
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        claims={"act": True, "su": False, "ver": 0},
+    )
+    _measure("uncached", _decode_uncached, token, args.rounds)
+    _measure("cached", _decode_cached, token, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
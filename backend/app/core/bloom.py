@@ -0,0 +1,36 @@
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    """
+    Set membership with false positives at about `error_rate` while it holds
+    at most `capacity` keys, and no false negatives. Lookups don't lock.
+    """
+
+    def __init__(self, *, capacity: int, error_rate: float) -> None:
+        capacity = max(capacity, 1)
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, key: bytes) -> list[int]:
+        # Double hashing: position i is h1 + i * h2
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key: bytes) -> None:
+        positions = self._positions(key)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
@@ -32,8 +32,39 @@ class Settings(BaseSettings):
     )
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str = secrets.token_urlsafe(32)
-    # 60 minutes * 24 hours * 8 days = 8 days
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # Access tokens are short lived, clients get new ones from /login/refresh
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # Access tokens of revoked refresh token families are rejected within this
+    # many seconds on other workers, right away on the one revoking them
+    REVOKED_SESSIONS_REFRESH_SECONDS: int = 30
+    REVOKED_SESSIONS_FILTER_ERROR_RATE: float = 0.001
+    # Embed is_active, is_superuser and a token version in access tokens, so
+    # most endpoints authorize without reading the user
+    STATELESS_AUTH: bool = False
+    # Password hashes run on their own pool, callers beyond the workers plus
+    # the queue get a 503 with Retry-After
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_SIZE: int = 16
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+    # argon2id costs for new hashes, memory in KiB. Hashes made with other
+    # costs or with bcrypt are replaced on the next login. Check the latency on
+    # the target hardware with `python -m app.benchmarks.hash_calibration`
+    ARGON2_TIME_COST: int = 2
+    ARGON2_MEMORY_COST: int = 19_456
+    ARGON2_PARALLELISM: int = 1
+    # Token buckets by client IP and by account for the routes that hash
+    # passwords or send emails, see app/core/ratelimit.py. Use the postgres
+    # store to share them between workers
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_STORE: Literal["memory", "postgres"] = "memory"
+    RATE_LIMITS: dict[str, str] = {
+        "login:ip": "30/minute",
+        "login:account": "10/minute",
+        "signup:ip": "10/hour",
+        "password_recovery:ip": "10/hour",
+        "password_recovery:account": "3/hour",
+    }
     FRONTEND_HOST: str = "http://localhost:5173"
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
 
@@ -68,6 +99,22 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Emails are queued in the emailoutbox table and sent by a dispatcher
+    # thread in every worker, retried EMAIL_OUTBOX_RETRY_SECONDS after a
+    # failure, twice as long after each further one
+    EMAIL_DISPATCHER_ENABLED: bool = True
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_SECONDS: float = 1.0
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+    EMAIL_OUTBOX_RETRY_SECONDS: int = 30
+    # Claimed emails are sent again after this long if their worker died
+    EMAIL_OUTBOX_LEASE_SECONDS: int = 300
+    # Emails, sent or not, are deleted by app/prune_email_outbox.py after this
+    EMAIL_OUTBOX_RETENTION_DAYS: int = 7
+    # Emails per INSERT when queueing a bulk notification
+    NOTIFICATION_INSERT_BATCH_SIZE: int = 1000
+    # Check the email templates for changes on every render, for development
+    EMAIL_TEMPLATES_AUTO_RELOAD: bool = False
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -98,6 +145,24 @@ class Settings(BaseSettings):
     FIRST_SUPERUSER_PASSWORD: str
 
     UPLOADS_DIR: str = "uploads"
+    BULK_CREATE_MAX_ROWS: int = 10_000
+    USER_PURGE_BATCH_SIZE: int = 1000
+    # Unfinished purges older than this are assumed interrupted, deleting the
+    # user again starts them over
+    USER_PURGE_RESUME_AFTER_SECONDS: int = 900
+    EXPORT_BATCH_SIZE: int = 5000
+    IMPORT_MAX_ERRORS: int = 1000
+    BATCH_GET_MAX_IDS: int = 100
+    # Changes newer than this are held back from delta sync until transactions
+    # that started before them have had time to commit
+    SYNC_SAFETY_WINDOW_SECONDS: int = 5
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = 30
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10_000
+    # Verified access tokens are kept until they expire or for this long,
+    # whichever comes first. A size of 0 disables the cache
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    TOKEN_CACHE_MAX_SIZE: int = 10_000
 
     def _check_default_secret(self, var_name: str, value: str | None) -> None:
         if value == "changethis":
@@ -1,3 +1,11 @@
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import event
 from sqlmodel import Session, create_engine, select
 
 from app import crud
@@ -7,6 +15,48 @@ from app.models import User, UserCreate
 engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
 
 
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Generator[QueryStats, None, None]:
+    """
+    Count the queries and DB time of everything executed inside the block.
+
+    The stats object is shared with threads and tasks spawned from this
+    context, so sync endpoints running on the threadpool are included.
+    """
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn: Any, *_: Any) -> None:
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn: Any, *_: Any) -> None:
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+
+
 # make sure all SQLModel models are imported (app.models) before initializing DB
 # otherwise, SQLModel might fail to initialize relationships properly
 # for more details: https://github.com/fastapi/full-stack-fastapi-template/issues/28
@@ -0,0 +1,59 @@
+"""
+Compile `form_data` filters given as query parameters into JSONB predicates.
+
+A filter is a dotted key path, `=` and a value:
+
+    scope=ISO 9001            form_data @> '{"scope": "ISO 9001"}'
+    site.count=3              form_data @> '{"site": {"count": 3}}'
+
+Values are read as JSON scalars when they parse as such (numbers, booleans,
+null, quoted strings) and as plain strings otherwise. Keys are restricted to
+identifiers and values are JSON encoded, so user input never reaches the SQL
+unescaped. Containment is served by the jsonb_path_ops GIN index on
+applications.form_data. Comparisons such as `>=` or `!=` are rejected, that
+index can't serve them and they would scan every application.
+"""
+
+import json
+import re
+from typing import Any
+
+from sqlalchemy import ColumnElement
+
+_KEY = r"[A-Za-z_][A-Za-z0-9_]*"
+_FILTER_RE = re.compile(
+    rf"^(?P<path>{_KEY}(?:\.{_KEY})*)\s*(?P<op>>=|<=|!=|=|>|<)\s*(?P<value>.*)$"
+)
+
+
+class FilterError(ValueError):
+    pass
+
+
+def _parse_value(raw: str) -> Any:
+    try:
+        value = json.loads(raw)
+    except json.JSONDecodeError:
+        return raw
+    if isinstance(value, dict | list):
+        raise FilterError(f"Filter values must be scalars, got {raw!r}")
+    return value
+
+
+def compile_filter(column: Any, expression: str) -> ColumnElement[bool]:
+    match = _FILTER_RE.match(expression.strip())
+    if not match:
+        raise FilterError(f"Invalid filter {expression!r}")
+    keys = match["path"].split(".")
+    # Comparisons are matched only to be rejected with a clear message
+    op = match["op"]
+    value = _parse_value(match["value"].strip())
+
+    if op != "=":
+        raise FilterError(
+            f"Unsupported operator {op!r} in {expression!r}, only = is supported"
+        )
+    document: Any = value
+    for key in reversed(keys):
+        document = {key: document}
+    return column.contains(document)  # type: ignore[no-any-return]
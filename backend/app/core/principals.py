@@ -0,0 +1,152 @@
+"""
+Authenticated principals, and a cache of the users authenticated by
+`get_current_user` so authenticated requests don't start with a query for
+the user.
+
+Changes to a user must call `invalidate_principal` before committing. It drops
+the local entry and sends a NOTIFY, delivered on commit, that makes the
+`InvalidationListener` of every worker drop theirs.
+
+A user loaded before such a commit can be cached after its NOTIFY was handled.
+Every invalidation therefore moves the user to a new generation, read with
+`principal_generation` before loading the user, and `cache_principal` skips
+users whose generation changed in between.
+"""
+
+import itertools
+import logging
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Any
+
+import psycopg
+from sqlalchemy import Engine, func, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "principal_invalidated"
+
+principal_cache: TTLCache[uuid.UUID, dict[str, Any]] = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+# Set while a listener receives invalidations, the cache is bypassed otherwise
+# as changes made by other workers would go unnoticed
+_listening = threading.Event()
+
+# Generation of the users invalidated recently, and of the whole cache, which
+# changes when it is cleared. Kept as long as the cache entries they guard.
+_counter = itertools.count(1)
+_generations: TTLCache[uuid.UUID, int] = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+_epoch = 0
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Who is making a request and what they may do."""
+
+    id: uuid.UUID
+    is_active: bool
+    is_superuser: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(id=user.id, is_active=user.is_active, is_superuser=user.is_superuser)
+
+
+def principal_generation(user_id: uuid.UUID) -> tuple[int, int | None]:
+    with _lock:
+        return _epoch, _generations.get(user_id)
+
+
+def cache_principal(user: User, generation: tuple[int, int | None]) -> None:
+    """Cache `user` unless it was invalidated since `generation` was read."""
+    if not _listening.is_set():
+        return
+    # Columns only, relationships are loaded from the session when used
+    columns = User.__table__.columns  # type: ignore[attr-defined]
+    data = {column.key: getattr(user, column.key) for column in columns}
+    with _lock:
+        if (_epoch, _generations.get(user.id)) == generation:
+            principal_cache.set(user.id, data)
+
+
+def _evict(user_id: uuid.UUID) -> None:
+    with _lock:
+        _generations.set(user_id, next(_counter))
+        principal_cache.pop(user_id)
+
+
+def _evict_all() -> None:
+    global _epoch
+    with _lock:
+        _epoch = next(_counter)
+        principal_cache.clear()
+
+
+def get_cached_principal(session: Session, user_id: uuid.UUID) -> User | None:
+    """
+    The cached user attached to `session` as if it had been loaded, so it can
+    be modified and committed like one.
+    """
+    data = principal_cache.get(user_id) if _listening.is_set() else None
+    if data is None:
+        return None
+    # Not model_validate, which mistakes the dict's methods for relationships
+    user = User(**data)
+    make_transient_to_detached(user)
+    session.add(user)
+    return user
+
+
+def get_cached_token_version(user_id: uuid.UUID) -> int | None:
+    data = principal_cache.get(user_id) if _listening.is_set() else None
+    return data["token_version"] if data else None
+
+
+def invalidate_principal(session: Session, user_id: uuid.UUID) -> None:
+    _evict(user_id)
+    session.execute(select(func.pg_notify(CHANNEL, str(user_id))))
+
+
+class InvalidationListener(threading.Thread):
+    """LISTENs for invalidations sent by any worker and applies them locally."""
+
+    def __init__(self, engine: Engine) -> None:
+        super().__init__(name="principal-invalidation-listener", daemon=True)
+        self.conninfo = engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                with psycopg.connect(self.conninfo, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    # Invalidations sent while disconnected were missed
+                    _evict_all()
+                    _listening.set()
+                    while not self.stopped.is_set():
+                        for notify in conn.notifies(timeout=1.0):
+                            _evict(uuid.UUID(notify.payload))
+            except psycopg.Error:
+                logger.exception("Principal invalidation listener disconnected")
+                self.stopped.wait(5)
+            finally:
+                _listening.clear()
+                _evict_all()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
@@ -0,0 +1,139 @@
+"""
+Token bucket rate limits for endpoints that hash passwords or send emails.
+
+Each route has limits by client IP and by account, in RATE_LIMITS as
+"<route>:<scope>" -> "<requests>/<period>", e.g. "login:ip": "30/minute". A
+bucket holds up to <requests> tokens and refills at <requests> per <period>.
+Buckets live in the worker with the memory store, or in Postgres, shared by
+every worker, with RATE_LIMIT_STORE=postgres.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Protocol
+
+from sqlalchemy import Engine, func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.models import RateLimitBucket
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+rejected = Counter("rate_limit_rejected_total", "Requests rejected by rate limits")
+
+
+@dataclass(frozen=True)
+class Rate:
+    capacity: int
+    period: float
+
+    @property
+    def refill(self) -> float:
+        """Tokens added per second."""
+        return self.capacity / self.period
+
+
+@lru_cache
+def parse_rate(spec: str) -> Rate:
+    count, _, period = spec.partition("/")
+    if period not in PERIODS or not count.isdigit() or int(count) < 1:
+        raise ValueError(f"Invalid rate limit {spec!r}, expected e.g. '10/minute'")
+    return Rate(capacity=int(count), period=PERIODS[period])
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__()
+        self.retry_after = retry_after
+
+
+class BucketStore(Protocol):
+    def consume(self, key: str, rate: Rate) -> float:
+        """
+        Take a token from the bucket of `key`. Returns 0 if there was one,
+        otherwise the seconds until there is.
+        """
+        ...
+
+
+class MemoryBucketStore:
+    """Buckets of this worker, beyond `maxsize` the least recently used is dropped."""
+
+    def __init__(self, maxsize: int = 100_000) -> None:
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, rate: Rate) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (rate.capacity, now))
+            tokens = min(rate.capacity, tokens + (now - updated_at) * rate.refill)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return 0.0 if allowed else (1 - tokens) / rate.refill
+
+
+class PostgresBucketStore:
+    """Buckets in the ratelimitbucket table, each taken in a single statement."""
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+
+    def consume(self, key: str, rate: Rate) -> float:
+        table = RateLimitBucket.__table__  # type: ignore[attr-defined]
+        refilled = func.least(
+            rate.capacity,
+            table.c.tokens
+            + func.extract("epoch", func.now() - table.c.updated_at) * rate.refill,
+        )
+        # The bucket isn't updated when empty, so nothing is returned
+        statement = (
+            insert(table)
+            .values(key=key, tokens=rate.capacity - 1, updated_at=func.now())
+            .on_conflict_do_update(
+                index_elements=[table.c.key],
+                set_={"tokens": refilled - 1, "updated_at": func.now()},
+                where=refilled >= 1,
+            )
+            .returning(table.c.tokens)
+        )
+        with self.engine.begin() as connection:
+            allowed = connection.execute(statement).first() is not None
+        # At most the time one token takes to refill
+        return 0.0 if allowed else 1 / rate.refill
+
+
+class RateLimiter:
+    def __init__(self, store: BucketStore) -> None:
+        self.store = store
+        # Fail on startup rather than on the first request
+        for spec in settings.RATE_LIMITS.values():
+            parse_rate(spec)
+
+    def check(self, route: str, *, ip: str | None, account: str | None = None) -> None:
+        """
+        Take a token from the IP and account buckets of `route` that have a
+        limit. Raises RateLimitExceeded if one of them is empty.
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        for scope, value in (("ip", ip), ("account", account)):
+            spec = settings.RATE_LIMITS.get(f"{route}:{scope}")
+            if spec is None or not value:
+                continue
+            retry_after = self.store.consume(
+                f"{route}:{scope}:{value.lower()}", parse_rate(spec)
+            )
+            if retry_after:
+                rejected.inc()
+                raise RateLimitExceeded(retry_after=math.ceil(retry_after))
@@ -0,0 +1,125 @@
+"""
+Revoked refresh token families. Access tokens carry the family (`sid`) of the
+refresh token they were issued with and are rejected once it is revoked.
+
+Authenticated requests check a Bloom filter of the families revoked within
+the lifetime of an access token, the tokens of families revoked earlier have
+expired anyway. `RevocationFilterRefresher` rebuilds it from the database
+every REVOKED_SESSIONS_REFRESH_SECONDS, and families revoked by this worker
+are added right away. Only hits, revoked families or false positives, are
+confirmed against the database.
+"""
+
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlmodel import col, select
+
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.models import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+false_positives = Counter(
+    "revoked_sessions_false_positives_total",
+    "Access tokens looked up in the database after a Bloom filter false positive",
+)
+
+
+class RevokedSessions:
+    def __init__(self) -> None:
+        # None until loaded, every family is looked up until then
+        self._filter: BloomFilter | None = None
+        # Families added while a load runs, which its snapshot may miss
+        self._pending: set[bytes] | None = None
+        self._lock = threading.Lock()
+
+    def load(self, session: Session) -> None:
+        with self._lock:
+            self._pending = set()
+        try:
+            since = datetime.now(timezone.utc) - timedelta(
+                minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
+            )
+            family_ids = session.scalars(
+                select(RefreshToken.family_id)
+                .where(col(RefreshToken.revoked_at) > since)
+                .distinct()
+            ).all()
+            # Room for revocations made by this worker until the next load
+            bloom = BloomFilter(
+                capacity=max(len(family_ids) * 2, 1000),
+                error_rate=settings.REVOKED_SESSIONS_FILTER_ERROR_RATE,
+            )
+            for family_id in family_ids:
+                bloom.add(family_id.bytes)
+            with self._lock:
+                for key in self._pending:
+                    bloom.add(key)
+                self._filter = bloom
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def add(self, family_id: uuid.UUID) -> None:
+        """Add a family whose revocation was committed."""
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(family_id.bytes)
+            if self._pending is not None:
+                self._pending.add(family_id.bytes)
+
+    def is_revoked(self, session: Session, family_id: uuid.UUID) -> bool:
+        bloom = self._filter
+        if bloom is not None and family_id.bytes not in bloom:
+            return False
+        statement = (
+            select(RefreshToken.id)
+            .where(
+                RefreshToken.family_id == family_id,
+                col(RefreshToken.revoked_at).is_not(None),
+            )
+            .limit(1)
+        )
+        revoked = session.scalar(statement) is not None
+        if bloom is not None and not revoked:
+            false_positives.inc()
+        return revoked
+
+    def clear(self) -> None:
+        with self._lock:
+            self._filter = None
+
+
+revoked_sessions = RevokedSessions()
+
+
+class RevocationFilterRefresher(threading.Thread):
+    """Rebuilds the filter of revoked sessions from the database periodically."""
+
+    def __init__(self, engine: Engine) -> None:
+        super().__init__(name="revoked-sessions-refresher", daemon=True)
+        self.engine = engine
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                with Session(self.engine) as session:
+                    revoked_sessions.load(session)
+            except SQLAlchemyError:
+                # Revocations made by other workers go unnoticed meanwhile
+                logger.exception("Could not load the revoked sessions")
+            self.stopped.wait(settings.REVOKED_SESSIONS_REFRESH_SECONDS)
+        revoked_sessions.clear()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
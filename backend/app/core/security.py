@@ -1,27 +1,108 @@
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, TypeVar
 
 import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
+
+# New hashes use argon2id. bcrypt hashes still verify, and like argon2 hashes
+# made with other costs they need an update, see `password_needs_rehash`
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated=["bcrypt"],
+    argon2__type="ID",
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
+
+# argon2 and bcrypt release the GIL, so hashes run in parallel on this pool while it
+# caps how much CPU logins can take. Calls beyond the workers plus the queue
+# are turned away rather than tying up the shared threadpool.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_hash_slots = threading.BoundedSemaphore(
+    settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE
+)
+
+hash_queue_depth = Gauge(
+    "password_hash_queue_depth", "Password hashes waiting for a worker"
+)
+hash_in_progress = Gauge("password_hash_in_progress", "Password hashes running")
+hash_rejected = Counter(
+    "password_hash_rejected_total", "Password hashes rejected with the queue full"
+)
+hash_wait_seconds = Histogram(
+    "password_hash_wait_seconds",
+    "Time password hashes waited for a worker",
+    buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5],
+)
+hash_seconds = Histogram(
+    "password_hash_seconds",
+    "Time spent hashing or verifying a password",
+    buckets=[0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2],
+)
+
+
+class PasswordHashingBusy(Exception):
+    """The password hashing queue is full, the request should be retried."""
+
+
+def _run_hash(fn: Callable[..., T], *args: Any) -> T:
+    if not _hash_slots.acquire(blocking=False):
+        hash_rejected.inc()
+        raise PasswordHashingBusy()
+    queued_at = time.perf_counter()
+    hash_queue_depth.inc()
+
+    def run() -> T:
+        started_at = time.perf_counter()
+        hash_queue_depth.dec()
+        hash_wait_seconds.observe(started_at - queued_at)
+        hash_in_progress.inc()
+        try:
+            return fn(*args)
+        finally:
+            hash_in_progress.dec()
+            hash_seconds.observe(time.perf_counter() - started_at)
+
+    try:
+        return _hash_executor.submit(run).result()
+    finally:
+        _hash_slots.release()
 
 
 ALGORITHM = "HS256"
 
 
-def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
+def create_access_token(
+    subject: str | Any,
+    expires_delta: timedelta,
+    claims: dict[str, Any] | None = None,
+) -> str:
     expire = datetime.now(timezone.utc) + expires_delta
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {**(claims or {}), "exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _run_hash(pwd_context.verify, plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _run_hash(pwd_context.hash, password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether the hash uses a deprecated scheme or other costs than configured."""
+    return pwd_context.needs_update(hashed_password)
@@ -1,11 +1,36 @@
+import hashlib
+import re
+import secrets
 import uuid
+from collections.abc import Iterable
+from itertools import islice
+from datetime import datetime, timedelta, timezone
 from typing import Any
-from sqlalchemy.orm import Session
+from sqlalchemy import any_, bindparam, func, insert, literal, or_, text, tuple_, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session, joinedload, load_only
+from sqlmodel import col, delete, select
 from . import models
-from datetime import datetime
 
+from app.core.config import settings
+from app.core.principals import invalidate_principal
+from app.core.revocation import revoked_sessions
 from app.core.security import get_password_hash, verify_password
-from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
+from app.models import (
+    GLOBAL_ITEM_COUNT_IDS,
+    EmailOutbox,
+    Item,
+    ItemCount,
+    ItemCreate,
+    RateLimitBucket,
+    RefreshToken,
+    Tombstone,
+    User,
+    UserCreate,
+    UserPurge,
+    UserUpdate,
+)
 
 
 def create_user(*, session: Session, user_create: UserCreate) -> User:
@@ -14,7 +39,6 @@ def create_user(*, session: Session, user_create: UserCreate) -> User:
     )
     session.add(db_obj)
     session.commit()
-    session.refresh(db_obj)
     return db_obj
 
 
@@ -27,8 +51,8 @@ def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
         extra_data["hashed_password"] = hashed_password
     db_user.sqlmodel_update(user_data, update=extra_data)
     session.add(db_user)
+    invalidate_principal(session, db_user.id)
     session.commit()
-    session.refresh(db_user)
     return db_user
 
 
@@ -47,36 +71,610 @@ def authenticate(*, session: Session, email: str, password: str) -> User | None:
     return db_user
 
 
+def rehash_password(
+    *, session: Session, user_id: uuid.UUID, old_hash: str, password: str
+) -> bool:
+    """
+    Replace `old_hash`, verified against `password`, with a hash made with the
+    current settings. Unlike a password change it doesn't revoke tokens. Does
+    nothing if the password was changed in the meantime.
+    """
+    new_hash = get_password_hash(password)
+    db_user = session.get(User, user_id, with_for_update=True)
+    if db_user is None or db_user.hashed_password != old_hash:
+        session.rollback()
+        return False
+    # Tells the bump_token_version trigger the password stays the same
+    session.execute(select(func.set_config("app.password_rehash", "on", True)))
+    db_user.hashed_password = new_hash
+    session.add(db_user)
+    invalidate_principal(session, user_id)
+    session.commit()
+    return True
+
+
+def _hash_refresh_token(token: str) -> str:
+    # Refresh tokens are random, a fast hash doesn't make guessing them easier
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_refresh_token(
+    *, session: Session, user: User, family_id: uuid.UUID | None = None
+) -> tuple[str, uuid.UUID]:
+    """
+    A new refresh token and its family, continuing `family_id` or starting a
+    new family. Commits the session.
+    """
+    token = secrets.token_urlsafe(32)
+    db_token = RefreshToken(
+        token_hash=_hash_refresh_token(token),
+        family_id=family_id or uuid.uuid4(),
+        user_id=user.id,
+        token_version=user.token_version,
+        expires_at=datetime.now(timezone.utc)
+        + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    session.add(db_token)
+    session.commit()
+    return token, db_token.family_id
+
+
+def use_refresh_token(*, session: Session, token: str) -> RefreshToken | None:
+    """
+    Mark a refresh token used, leaving the caller to issue the next one of
+    its family and commit. None if the token is unknown, expired or revoked,
+    or if its user was deactivated or changed since the family started.
+    Presenting a token that was already used revokes its family, as it has
+    likely been stolen.
+    """
+    statement = (
+        select(RefreshToken)
+        .where(RefreshToken.token_hash == _hash_refresh_token(token))
+        .with_for_update()
+    )
+    db_token = session.exec(statement).first()
+    now = datetime.now(timezone.utc)
+    if db_token is None or db_token.revoked_at or db_token.expires_at <= now:
+        session.rollback()
+        return None
+    user = session.get(User, db_token.user_id)
+    if (
+        db_token.used_at
+        or user is None
+        or not user.is_active
+        or user.token_version != db_token.token_version
+    ):
+        revoke_refresh_token_family(session=session, family_id=db_token.family_id)
+        return None
+    db_token.used_at = now
+    session.add(db_token)
+    return db_token
+
+
+def revoke_refresh_token_family(*, session: Session, family_id: uuid.UUID) -> None:
+    """Revoke the refresh tokens of a family, and the access tokens issued with them."""
+    session.execute(
+        update(RefreshToken)
+        .where(
+            col(RefreshToken.family_id) == family_id,
+            col(RefreshToken.revoked_at).is_(None),
+        )
+        .values(revoked_at=func.now())
+    )
+    session.commit()
+    # Once committed, a filter loading from now on either reads it or gets it added
+    revoked_sessions.add(family_id)
+
+
+def revoke_refresh_token(*, session: Session, token: str) -> bool:
+    statement = select(RefreshToken).where(
+        RefreshToken.token_hash == _hash_refresh_token(token)
+    )
+    db_token = session.exec(statement).first()
+    if db_token is None:
+        return False
+    revoke_refresh_token_family(session=session, family_id=db_token.family_id)
+    return True
+
+
+def prune_refresh_tokens(*, session: Session, before: datetime) -> int:
+    result = session.execute(
+        delete(RefreshToken).where(col(RefreshToken.expires_at) < before)
+    )
+    session.commit()
+    return result.rowcount
+
+
+def prune_rate_limit_buckets(*, session: Session, before: datetime) -> int:
+    result = session.execute(
+        delete(RateLimitBucket).where(col(RateLimitBucket.updated_at) < before)
+    )
+    session.commit()
+    return result.rowcount
+
+
+def prune_email_outbox(*, session: Session, before: datetime) -> int:
+    """Delete the emails queued before `before`, whether sent or not."""
+    result = session.execute(
+        delete(EmailOutbox).where(col(EmailOutbox.created_at) < before)
+    )
+    session.commit()
+    return result.rowcount
+
+
+def enqueue_email(
+    *, session: Session, email_to: str, subject: str, html_content: str
+) -> EmailOutbox:
+    """Queue an email, sent once the caller commits the session."""
+    email = EmailOutbox(email_to=email_to, subject=subject, html_content=html_content)
+    session.add(email)
+    return email
+
+
+def enqueue_email_batch(
+    *, session: Session, emails: Iterable[tuple[str, str, str]]
+) -> tuple[uuid.UUID, int]:
+    """
+    Queue (email_to, subject, html_content) `emails` under a new batch id, in
+    multi-row INSERTs, and commit. Returns the batch id and the email count.
+    """
+    batch_id = uuid.uuid4()
+    count = 0
+    rows = iter(emails)
+    while chunk := list(islice(rows, settings.NOTIFICATION_INSERT_BATCH_SIZE)):
+        now = datetime.now(timezone.utc)
+        session.execute(
+            insert(EmailOutbox),
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "batch_id": batch_id,
+                    "email_to": email_to,
+                    "subject": subject,
+                    "html_content": html_content,
+                    "status": "pending",
+                    "attempts": 0,
+                    "next_attempt_at": now,
+                    "created_at": now,
+                }
+                for email_to, subject, html_content in chunk
+            ],
+        )
+        count += len(chunk)
+    session.commit()
+    return batch_id, count
+
+
+def get_email_batch_counts(
+    *, session: Session, batch_id: uuid.UUID
+) -> dict[str, tuple[int, datetime, datetime | None]]:
+    """Email count, first queued and last sent time by status of a batch."""
+    statement = (
+        select(
+            EmailOutbox.status,
+            func.count(),
+            func.min(EmailOutbox.created_at),
+            func.max(EmailOutbox.sent_at),
+        )
+        .where(EmailOutbox.batch_id == batch_id)
+        .group_by(EmailOutbox.status)
+    )
+    return {
+        status: (count, created_at, sent_at)
+        for status, count, created_at, sent_at in session.execute(statement)
+    }
+
+
+def get_email_batch_recipients(
+    *, session: Session, batch_id: uuid.UUID, skip: int, limit: int
+) -> list[EmailOutbox]:
+    statement = (
+        select(EmailOutbox)
+        .where(EmailOutbox.batch_id == batch_id)
+        .order_by(col(EmailOutbox.email_to), col(EmailOutbox.id))
+        .offset(skip)
+        .limit(limit)
+    )
+    return list(session.scalars(statement))
+
+
+def claim_emails(
+    *, session: Session, limit: int, lease: timedelta
+) -> list[EmailOutbox]:
+    """
+    Take up to `limit` due emails, skipping those other workers are claiming.
+    They are due again once `lease` is over, in case this worker dies before
+    recording the outcome.
+    """
+    due = (
+        select(EmailOutbox.id)
+        .where(col(EmailOutbox.next_attempt_at) <= func.now())
+        .order_by(col(EmailOutbox.next_attempt_at))
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    statement = (
+        update(EmailOutbox)
+        .where(col(EmailOutbox.id).in_(due))
+        .values(
+            next_attempt_at=func.now() + lease,
+            attempts=col(EmailOutbox.attempts) + 1,
+        )
+        .returning(EmailOutbox)
+    )
+    emails = list(session.scalars(statement))
+    session.commit()
+    return emails
+
+
+def mark_email_sent(*, session: Session, email: EmailOutbox) -> None:
+    email.status = "sent"
+    email.sent_at = datetime.now(timezone.utc)
+    email.next_attempt_at = None
+    # Emails carry password reset tokens, they aren't kept once done with
+    email.html_content = ""
+    session.add(email)
+    session.commit()
+
+
+def mark_email_failed(
+    *, session: Session, email: EmailOutbox, error: str, retry_at: datetime | None
+) -> None:
+    """Record a failed attempt, giving up on the email without `retry_at`."""
+    if retry_at is None:
+        email.status = "failed"
+        email.html_content = ""
+    email.next_attempt_at = retry_at
+    email.last_error = error
+    session.add(email)
+    session.commit()
+
+
+def create_user_purge(*, session: Session, db_user: User) -> UserPurge:
+    # The user can't log in and drops out of listings from now on
+    db_user.is_active = False
+    purge = UserPurge(user_id=db_user.id)
+    session.add(db_user)
+    session.add(purge)
+    invalidate_principal(session, db_user.id)
+    session.commit()
+    return purge
+
+
+def get_or_create_user_purge(
+    *, session: Session, db_user: User
+) -> tuple[UserPurge, bool]:
+    """
+    The unfinished purge of the user, or a new one, and whether it has to be
+    run: when it was created, or when it's been unfinished for longer than
+    USER_PURGE_RESUME_AFTER_SECONDS, likely interrupted by a restart. Concurrent
+    calls for the same user wait on its row, so only one creates it.
+    """
+    session.execute(select(User.id).where(col(User.id) == db_user.id).with_for_update())
+    statement = select(UserPurge).where(
+        col(UserPurge.user_id) == db_user.id, col(UserPurge.finished_at).is_(None)
+    )
+    purge = session.exec(statement).first()
+    if purge:
+        session.commit()
+        resume_after = timedelta(seconds=settings.USER_PURGE_RESUME_AFTER_SECONDS)
+        return purge, purge.created_at < datetime.now(timezone.utc) - resume_after
+    return create_user_purge(session=session, db_user=db_user), True
+
+
+def purge_user(*, session: Session, purge: UserPurge, batch_size: int) -> UserPurge:
+    """
+    Delete the items of a user in batches, each in its own short transaction,
+    then the user itself. Progress is committed after every batch, and running
+    it again resumes an interrupted purge.
+    """
+    purge.status = "running"
+    session.add(purge)
+    session.commit()
+    while True:
+        batch = select(Item.id).where(Item.owner_id == purge.user_id).limit(batch_size)
+        result = session.execute(delete(Item).where(col(Item.id).in_(batch)))
+        purge.items_deleted += result.rowcount  # type: ignore[attr-defined]
+        session.add(purge)
+        session.commit()
+        if result.rowcount < batch_size:  # type: ignore[attr-defined]
+            break
+    session.execute(delete(User).where(col(User.id) == purge.user_id))
+    invalidate_principal(session, purge.user_id)
+    purge.status = "done"
+    purge.finished_at = datetime.now(timezone.utc)
+    session.add(purge)
+    session.commit()
+    return purge
+
+
 def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -> Item:
     db_item = Item.model_validate(item_in, update={"owner_id": owner_id})
     session.add(db_item)
     session.commit()
-    session.refresh(db_item)
     return db_item
 
 
+def create_items(
+    *, session: Session, items_in: list[ItemCreate], owner_id: uuid.UUID
+) -> list[Item]:
+    db_items = [
+        Item.model_validate(item_in, update={"owner_id": owner_id})
+        for item_in in items_in
+    ]
+    if db_items:
+        # ids are generated client side, so one executemany INSERT is enough
+        session.execute(insert(Item), [db_item.model_dump() for db_item in db_items])
+        session.commit()
+    return db_items
+
+
+def get_item_count(*, session: Session, owner_id: uuid.UUID | None = None) -> int:
+    if owner_id:
+        item_count = session.get(ItemCount, owner_id)
+        return item_count.count if item_count else 0
+    statement = select(func.coalesce(func.sum(ItemCount.count), 0)).where(
+        col(ItemCount.owner_id).in_(GLOBAL_ITEM_COUNT_IDS)
+    )
+    return int(session.exec(statement).one())
+
+
+def reconcile_item_counts(*, session: Session) -> int:
+    """
+    Recompute the item counters from the item table, fixing any drift. Item
+    writes are blocked while it runs. Returns the number of counters whose
+    value was wrong, the global shards counting as one.
+    """
+    session.execute(text("LOCK TABLE item IN SHARE MODE"))
+    fixed = session.execute(
+        text(
+            """
+            WITH actual AS (
+                SELECT owner_id, count(*) AS count FROM item GROUP BY owner_id
+            ),
+            upserted AS (
+                INSERT INTO itemcount (owner_id, count)
+                SELECT owner_id, count FROM actual
+                ON CONFLICT (owner_id) DO UPDATE SET count = EXCLUDED.count
+                WHERE itemcount.count <> EXCLUDED.count
+                RETURNING owner_id
+            ),
+            deleted AS (
+                -- Owners without items, only counters that weren't zero drifted
+                DELETE FROM itemcount
+                WHERE owner_id NOT IN (SELECT owner_id FROM actual)
+                AND owner_id <> ALL(:global_ids)
+                RETURNING count
+            ),
+            global AS (
+                -- Only the sum of the shards matters, the first one takes the drift
+                INSERT INTO itemcount (owner_id, count)
+                SELECT :global_id, (SELECT count(*) FROM item) - coalesce(sum(count), 0)
+                FROM itemcount
+                WHERE owner_id = ANY(:global_ids) AND owner_id <> :global_id
+                ON CONFLICT (owner_id) DO UPDATE SET count = EXCLUDED.count
+                WHERE itemcount.count <> EXCLUDED.count
+                RETURNING count, xmax = 0 AS inserted
+            )
+            SELECT (SELECT count(*) FROM upserted)
+                + (SELECT count(*) FROM deleted WHERE count <> 0)
+                + (SELECT count(*) FROM global WHERE NOT (inserted AND count = 0))
+            """
+        ),
+        {"global_id": GLOBAL_ITEM_COUNT_IDS[0], "global_ids": GLOBAL_ITEM_COUNT_IDS},
+    ).scalar_one()
+    session.commit()
+    return int(fixed)
+
+
+def get_sync_horizon(*, session: Session, window: timedelta) -> datetime:
+    """
+    Database time minus `window`. Rows changed after it may still have
+    concurrent transactions committing before them, so sync stops there.
+    """
+    return session.execute(select(func.now() - window)).scalar_one()
+
+
+def get_changed(
+    *,
+    session: Session,
+    model: Any,
+    after: tuple[datetime, uuid.UUID] | None,
+    horizon: datetime,
+    limit: int,
+    filters: Iterable[Any] = (),
+) -> list[Any]:
+    """Rows updated after the `after` keyset position and before `horizon`."""
+    statement = select(model).where(model.updated_at < horizon, *filters)
+    if after:
+        statement = statement.where(tuple_(model.updated_at, model.id) > tuple_(*after))
+    statement = statement.order_by(model.updated_at, model.id).limit(limit)
+    return list(session.scalars(statement))
+
+
+def get_tombstones(
+    *,
+    session: Session,
+    table_name: str,
+    after: tuple[datetime, int],
+    horizon: datetime,
+    limit: int,
+    owner_id: uuid.UUID | None = None,
+) -> list[Tombstone]:
+    statement = select(Tombstone).where(
+        Tombstone.table_name == table_name,
+        Tombstone.deleted_at < horizon,
+        tuple_(Tombstone.deleted_at, Tombstone.id) > tuple_(*after),
+    )
+    if owner_id:
+        statement = statement.where(Tombstone.owner_id == owner_id)
+    statement = statement.order_by(
+        col(Tombstone.deleted_at), col(Tombstone.id)
+    ).limit(limit)
+    return list(session.scalars(statement))
+
+
+def prune_tombstones(*, session: Session, before: datetime) -> int:
+    result = session.execute(
+        delete(Tombstone).where(col(Tombstone.deleted_at) < before)
+    )
+    session.commit()
+    return result.rowcount
+
+
+def _insert_returning(db: Session, model, rows: list[dict]) -> list[dict]:
+    # Multi-row INSERT ... RETURNING, batched by SQLAlchemy's insertmanyvalues
+    if not rows:
+        return []
+    table = model.__table__
+    result = db.execute(insert(table).returning(*table.c, sort_by_parameter_order=True), rows)
+    return [dict(row) for row in result.mappings()]
+
+def _update_returning(db: Session, model, id: uuid.UUID, data: dict) -> dict | None:
+    # Single UPDATE ... WHERE id = :id RETURNING *, an empty result means no such row
+    table = model.__table__
+    row = db.execute(
+        update(table).where(table.c.id == id).values(**data).returning(*table.c)
+    ).mappings().first()
+    db.commit()
+    return dict(row) if row else None
+
+def get_existing_ids(db: Session, model, ids: set[uuid.UUID]) -> set[uuid.UUID]:
+    if not ids:
+        return set()
+    return set(db.scalars(select(model.id).where(model.id.in_(ids))))
+
+def get_by_ids(db: Session, model, ids: list[uuid.UUID]) -> dict:
+    """
+    Fetch rows by id with a single `id = ANY(:ids)` query, keyed by id in the
+    requested order. Ids without a row map to None.
+    """
+    # One array parameter instead of one per id, so the statement text (and
+    # its cached plan) doesn't depend on how many ids are asked for
+    ids_param = bindparam("ids", list(ids), type_=ARRAY(model.__table__.c.id.type))
+    found = {obj.id: obj for obj in db.scalars(select(model).where(model.id == any_(ids_param)))}
+    return {id: found.get(id) for id in ids}
+
+
 # Company CRUD operations
 def create_company(db: Session, company_data: dict):
     db_company = models.Company(**company_data)
     db.add(db_company)
     db.commit()
-    db.refresh(db_company)
     return db_company
 
-def get_company(db: Session, company_id: uuid.UUID):
-    return db.query(models.Company).filter(models.Company.id == company_id).first()
+def create_companies(db: Session, companies_data: list[dict]) -> list[dict | None]:
+    """
+    Insert companies, skipping rows whose registration number is taken, by an
+    existing company or an earlier row. Returns the new company of each row in
+    order, None for the skipped ones.
+    """
+    if not companies_data:
+        return []
+    table = models.Company.__table__
+    statement = (
+        postgresql.insert(table)
+        .on_conflict_do_nothing(index_elements=[table.c.registration_number])
+        .returning(*table.c)
+    )
+    inserted = {
+        row["registration_number"]: dict(row)
+        for row in db.execute(statement, companies_data).mappings()
+    }
+    db.commit()
+    return [inserted.pop(data["registration_number"], None) for data in companies_data]
+
+COMPANY_IMPORT_COLUMNS = [
+    "name", "address", "contact_person", "email", "phone", "industry",
+    "registration_number", "employees", "website", "logo",
+]
+
+def import_companies(db: Session, companies_data: Iterable[dict]) -> dict[str, int]:
+    """
+    Upsert companies on their registration number. Rows are streamed with COPY
+    into a temporary staging table and merged with a single INSERT; when a
+    registration number repeats, the last row wins.
+    """
+    columns = ", ".join(COMPANY_IMPORT_COLUMNS)
+    db.execute(text(
+        f"CREATE TEMP TABLE company_import ON COMMIT DROP AS "
+        f"SELECT 0 AS line, {columns} FROM companies WITH NO DATA"
+    ))
+    cursor = db.connection().connection.cursor()
+    loaded = 0
+    with cursor.copy(f"COPY company_import (line, {columns}) FROM STDIN") as copy:
+        for line, company_data in enumerate(companies_data):
+            copy.write_row([line, *(company_data[c] for c in COMPANY_IMPORT_COLUMNS)])
+            loaded += 1
+    updates = ", ".join(
+        f"{c} = EXCLUDED.{c}" for c in COMPANY_IMPORT_COLUMNS if c != "logo"
+    )
+    inserted, updated = db.execute(text(
+        f"""
+        WITH merged AS (
+            INSERT INTO companies ({columns})
+            SELECT DISTINCT ON (registration_number) {columns} FROM company_import
+            ORDER BY registration_number, line DESC
+            ON CONFLICT (registration_number) DO UPDATE
+            SET {updates}, logo = coalesce(EXCLUDED.logo, companies.logo)
+            RETURNING xmax = 0 AS inserted
+        )
+        SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)
+        FROM merged
+        """
+    )).one()
+    db.commit()
+    return {"inserted": inserted, "updated": updated, "skipped": loaded - inserted - updated}
+
+def _load_only(model, fields: list[str] | None) -> list:
+    # Columns not requested are left out of the SELECT
+    return [load_only(*(getattr(model, field) for field in fields))] if fields else []
+
+def get_company(db: Session, company_id: uuid.UUID, fields: list[str] | None = None):
+    return (
+        db.query(models.Company)
+        .options(*_load_only(models.Company, fields))
+        .filter(models.Company.id == company_id)
+        .first()
+    )
+
+def get_companies(db: Session, skip: int = 0, limit: int = 100, fields: list[str] | None = None):
+    return (
+        db.query(models.Company)
+        .options(*_load_only(models.Company, fields))
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
 
-def get_companies(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Company).offset(skip).limit(limit).all()
+def search_companies(db: Session, query: str, skip: int = 0, limit: int = 20):
+    terms = re.findall(r"\w+", query.lower())
+    if not terms:
+        return []
+    # Every term is matched as a word prefix, so partially typed input matches
+    ts_query = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+    rank = func.ts_rank_cd(models.Company.search_vector, ts_query) + func.word_similarity(
+        query, models.Company.name
+    )
+    return (
+        db.query(models.Company)
+        .filter(
+            or_(
+                models.Company.search_vector.bool_op("@@")(ts_query),
+                # Trigram word similarity tolerates typos in names
+                literal(query).bool_op("<%")(models.Company.name),
+                literal(query).bool_op("<%")(models.Company.contact_person),
+                models.Company.registration_number.startswith(query, autoescape=True),
+            )
+        )
+        .order_by(rank.desc(), models.Company.name, models.Company.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
 
 def update_company(db: Session, company_id: uuid.UUID, company_data: dict):
-    db_company = db.query(models.Company).filter(models.Company.id == company_id).first()
-    if db_company:
-        for key, value in company_data.items():
-            setattr(db_company, key, value)
-        db.commit()
-        db.refresh(db_company)
-    return db_company
+    return _update_returning(db, models.Company, company_id, company_data)
 
 def delete_company(db: Session, company_id: uuid.UUID):
     db_company = db.query(models.Company).filter(models.Company.id == company_id).first()
@@ -91,7 +689,6 @@ def create_qms_type(db: Session, qms_type_data: dict):
     db_qms_type = models.QMSType(**qms_type_data)
     db.add(db_qms_type)
     db.commit()
-    db.refresh(db_qms_type)
     return db_qms_type
 
 def get_qms_type(db: Session, qms_type_id: uuid.UUID):
@@ -100,14 +697,19 @@ def get_qms_type(db: Session, qms_type_id: uuid.UUID):
 def get_qms_types(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.QMSType).offset(skip).limit(limit).all()
 
+def get_qms_type_applicant_contacts(db: Session, qms_type_id: uuid.UUID):
+    """Email and contact person of each company that applied for the QMS type."""
+    statement = (
+        select(models.Company.email, models.Company.contact_person)
+        .join(models.Application, models.Application.company_id == models.Company.id)
+        .where(models.Application.qms_type_id == qms_type_id)
+        .distinct(models.Company.email)
+        .order_by(models.Company.email)
+    )
+    return db.execute(statement).all()
+
 def update_qms_type(db: Session, qms_type_id: uuid.UUID, qms_type_data: dict):
-    db_qms_type = db.query(models.QMSType).filter(models.QMSType.id == qms_type_id).first()
-    if db_qms_type:
-        for key, value in qms_type_data.items():
-            setattr(db_qms_type, key, value)
-        db.commit()
-        db.refresh(db_qms_type)
-    return db_qms_type
+    return _update_returning(db, models.QMSType, qms_type_id, qms_type_data)
 
 def delete_qms_type(db: Session, qms_type_id: uuid.UUID):
     db_qms_type = db.query(models.QMSType).filter(models.QMSType.id == qms_type_id).first()
@@ -122,31 +724,64 @@ def create_application(db: Session, application_data: dict):
     db_application = models.Application(**application_data)
     db.add(db_application)
     db.commit()
-    db.refresh(db_application)
     return db_application
 
-def get_application(db: Session, application_id: uuid.UUID):
-    return db.query(models.Application).filter(models.Application.id == application_id).first()
+def create_applications(db: Session, applications_data: list[dict]):
+    applications = _insert_returning(db, models.Application, applications_data)
+    db.commit()
+    return applications
 
-def get_applications(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Application).offset(skip).limit(limit).all()
+def _expand_application(expand: list[str]) -> list:
+    # Many-to-one, so each one is a LEFT JOIN on the same query
+    return [joinedload(getattr(models.Application, relationship)) for relationship in expand]
+
+def get_application(
+    db: Session,
+    application_id: uuid.UUID,
+    fields: list[str] | None = None,
+    expand: list[str] = (),
+):
+    return (
+        db.query(models.Application)
+        .options(*_load_only(models.Application, fields), *_expand_application(expand))
+        .filter(models.Application.id == application_id)
+        .first()
+    )
+
+def get_application_with_company(db: Session, application_id: uuid.UUID):
+    return (
+        db.query(models.Application)
+        .options(joinedload(models.Application.company))
+        .filter(models.Application.id == application_id)
+        .first()
+    )
+
+def get_applications(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    filters: list = (),
+    fields: list[str] | None = None,
+    expand: list[str] = (),
+):
+    return (
+        db.query(models.Application)
+        .options(*_load_only(models.Application, fields), *_expand_application(expand))
+        .filter(*filters)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
 
 def update_application(db: Session, application_id: uuid.UUID, application_data: dict):
-    db_application = db.query(models.Application).filter(models.Application.id == application_id).first()
-    if db_application:
-        application_data["updated_at"] = datetime.utcnow()
-        for key, value in application_data.items():
-            setattr(db_application, key, value)
-        db.commit()
-        db.refresh(db_application)
-    return db_application
+    # updated_at is set by the update_applications_updated_at trigger
+    return _update_returning(db, models.Application, application_id, application_data)
 
 # Document CRUD operations
 def create_document(db: Session, document_data: dict):
     db_document = models.Document(**document_data)
     db.add(db_document)
     db.commit()
-    db.refresh(db_document)
     return db_document
 
 def get_document(db: Session, document_id: uuid.UUID):
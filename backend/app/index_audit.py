@@ -0,0 +1,240 @@
+"""
+Audit indexes against the foreign keys and query predicates of the app.
+
+Reports foreign key columns that don't lead any index, and columns compared in
+the routers and crud (`Model.column == ...`, `col(Model.column).in_(...)`)
+that have no supporting index. Indexes are read from the model metadata, or
+from the database with --live. With --emit-migration an Alembic revision that
+creates the missing indexes with CREATE INDEX CONCURRENTLY is written, so they
+can be added to a busy database without blocking writes:
+
+    python app/index_audit.py --live --emit-migration
+"""
+
+import argparse
+import ast
+import logging
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import PrimaryKeyConstraint, Table, UniqueConstraint, inspect
+from sqlmodel import SQLModel
+
+from app.core.db import engine
+from app.database import Base
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).parent
+PREDICATE_SOURCES = [APP_DIR / "crud.py", *sorted((APP_DIR / "api").rglob("*.py"))]
+# Column methods that build predicates an index can serve
+PREDICATE_METHODS = {"in_", "like", "ilike", "startswith", "contains"}
+
+MIGRATION_TEMPLATE = '''"""Add missing indexes
+
+Revision ID: {revision}
+Revises: {down_revision}
+Create Date: {create_date}
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '{revision}'
+down_revision = '{down_revision}'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+{upgrade_ops}
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+{downgrade_ops}
+'''
+
+
+@dataclass(frozen=True)
+class MissingIndex:
+    table: str
+    column: str
+    reason: str
+
+    @property
+    def index_name(self) -> str:
+        return f"ix_{self.table}_{self.column}"
+
+
+def mapped_tables() -> dict[str, Table]:
+    """Tables of the SQLModel and declarative models, by model class name."""
+    return {
+        mapper.class_.__name__: mapper.local_table
+        for registry in (SQLModel._sa_registry, Base.registry)
+        for mapper in registry.mappers
+        if isinstance(mapper.local_table, Table)
+    }
+
+
+def _metadata_leading_columns(table: Table) -> set[str]:
+    # Expression indexes have no columns
+    leading = {list(index.columns)[0].name for index in table.indexes if index.columns}
+    for constraint in table.constraints:
+        if isinstance(constraint, PrimaryKeyConstraint | UniqueConstraint):
+            columns = list(constraint.columns)
+            if columns:
+                leading.add(columns[0].name)
+    return leading
+
+
+def _live_leading_columns(table_name: str) -> set[str]:
+    inspector = inspect(engine)
+    column_lists: list[Sequence[str | None]] = [
+        index["column_names"] for index in inspector.get_indexes(table_name)
+    ]
+    column_lists += [
+        constraint["column_names"]
+        for constraint in inspector.get_unique_constraints(table_name)
+    ]
+    column_lists.append(inspector.get_pk_constraint(table_name)["constrained_columns"])
+    # Expression indexes report None for their columns
+    return {columns[0] for columns in column_lists if columns and columns[0]}
+
+
+def _model_column(node: ast.AST) -> tuple[str, str] | None:
+    # Model.column, models.Model.column or col(Model.column)
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id == "col"
+        and node.args
+    ):
+        node = node.args[0]
+    if isinstance(node, ast.Attribute):
+        if isinstance(node.value, ast.Name):
+            return node.value.id, node.attr
+        if isinstance(node.value, ast.Attribute):
+            return node.value.attr, node.attr
+    return None
+
+
+def find_predicate_columns(paths: list[Path]) -> set[tuple[str, str]]:
+    """(model class name, attribute) pairs used in comparisons in the sources."""
+    found = set()
+    for path in paths:
+        for node in ast.walk(ast.parse(path.read_text())):
+            if isinstance(node, ast.Compare):
+                candidates = [node.left, *node.comparators]
+            elif (
+                isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Attribute)
+                and node.func.attr in PREDICATE_METHODS
+            ):
+                candidates = [node.func.value]
+            else:
+                continue
+            for candidate in candidates:
+                reference = _model_column(candidate)
+                if reference:
+                    found.add(reference)
+    return found
+
+
+def audit(*, live: bool = False) -> list[MissingIndex]:
+    tables = mapped_tables()
+    unique_tables = {table.name: table for table in tables.values()}
+    leading = {
+        name: _live_leading_columns(name) if live else _metadata_leading_columns(table)
+        for name, table in unique_tables.items()
+    }
+
+    missing: dict[tuple[str, str], MissingIndex] = {}
+    for name, table in sorted(unique_tables.items()):
+        for foreign_key in table.foreign_keys:
+            column = foreign_key.parent.name
+            if column not in leading[name]:
+                missing[(name, column)] = MissingIndex(name, column, "foreign key")
+    for class_name, attribute in sorted(find_predicate_columns(PREDICATE_SOURCES)):
+        model_table = tables.get(class_name)
+        if model_table is None or attribute not in model_table.c:
+            continue
+        column = model_table.c[attribute].name
+        if column not in leading[model_table.name]:
+            missing.setdefault(
+                (model_table.name, column),
+                MissingIndex(model_table.name, column, "filtered in routers"),
+            )
+    return list(missing.values())
+
+
+def render_migration(
+    missing: list[MissingIndex], *, revision: str, down_revision: str
+) -> str:
+    upgrade_ops = "\n".join(
+        f"        op.create_index('{m.index_name}', '{m.table}', ['{m.column}'], "
+        "postgresql_concurrently=True, if_not_exists=True)"
+        for m in missing
+    )
+    downgrade_ops = "\n".join(
+        f"        op.drop_index('{m.index_name}', table_name='{m.table}', "
+        "postgresql_concurrently=True, if_exists=True)"
+        for m in reversed(missing)
+    )
+    return MIGRATION_TEMPLATE.format(
+        revision=revision,
+        down_revision=down_revision,
+        create_date=datetime.now(),
+        upgrade_ops=upgrade_ops,
+        downgrade_ops=downgrade_ops,
+    )
+
+
+def emit_migration(missing: list[MissingIndex]) -> Path:
+    script = ScriptDirectory.from_config(Config(str(APP_DIR.parent / "alembic.ini")))
+    revision = uuid.uuid4().hex[:12]
+    path = Path(script.versions) / f"{revision}_add_missing_indexes.py"
+    path.write_text(
+        render_migration(
+            missing, revision=revision, down_revision=str(script.get_current_head())
+        )
+    )
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Audit indexes against foreign keys and query predicates"
+    )
+    parser.add_argument(
+        "--live", action="store_true", help="read indexes from the database"
+    )
+    parser.add_argument(
+        "--emit-migration",
+        action="store_true",
+        help="write an Alembic revision creating the missing indexes",
+    )
+    args = parser.parse_args()
+
+    missing = audit(live=args.live)
+    if not missing:
+        logger.info("No missing indexes found")
+        return
+    for m in missing:
+        logger.warning(f"{m.table}.{m.column} has no index ({m.reason})")
+    if args.emit_migration:
+        path = emit_migration(missing)
+        logger.info(f"Migration written to {path}")
+
+
+if __name__ == "__main__":
+    main()
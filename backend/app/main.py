@@ -1,10 +1,21 @@
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+
 import sentry_sdk
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
 from app.core.config import settings
+from app.core.db import engine, track_queries
+from app.core.principals import InvalidationListener
+from app.core.ratelimit import RateLimitExceeded
+from app.core.revocation import RevocationFilterRefresher
+from app.core.security import PasswordHashingBusy
+from app.outbox import EmailDispatcher
+from app.utils import load_email_templates
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -14,10 +25,31 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    load_email_templates()
+    # Principals are only cached while invalidations from other workers arrive
+    listener = InvalidationListener(engine)
+    listener.start()
+    refresher = RevocationFilterRefresher(engine)
+    refresher.start()
+    dispatcher = None
+    if settings.EMAIL_DISPATCHER_ENABLED:
+        dispatcher = EmailDispatcher(engine)
+        dispatcher.start()
+    yield
+    if dispatcher:
+        dispatcher.stop()
+    refresher.stop()
+    listener.stop()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -30,4 +62,37 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+
+@app.middleware("http")
+async def add_server_timing_header(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    with track_queries() as stats:
+        response = await call_next(request)
+    response.headers.append("Server-Timing", stats.server_timing())
+    return response
+
+
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(
+    _request: Request, _exc: PasswordHashingBusy
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many requests, try again shortly"},
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
+
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(
+    _request: Request, exc: RateLimitExceeded
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many requests, try again later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -1,8 +1,22 @@
 import uuid
-from datetime import datetime
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, JSON
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
+from typing import Any
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Computed,
+    DateTime,
+    FetchedValue,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR, UUID
+from sqlalchemy.orm import deferred, relationship
 from sqlmodel import SQLModel, Field, Relationship
 from .database import Base
 from pydantic import EmailStr
@@ -45,8 +59,22 @@ class UpdatePassword(SQLModel):
 
 # Database model, database table inferred from class name
 class User(UserBase, table=True):
+    __table_args__ = (Index("ix_user_updated_at_id", "updated_at", "id"),)
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     hashed_password: str
+    # Bumped by the bump_token_version trigger when is_active, is_superuser or
+    # the password change, revoking the stateless tokens issued before
+    token_version: int = Field(
+        default=0,
+        sa_column_kwargs={"server_default": "0", "server_onupdate": FetchedValue()},
+    )
+    # Set by the set_updated_at trigger on every insert and update
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),  # type: ignore
+        sa_column_kwargs={"server_default": func.now()},
+    )
     items: list["Item"] = Relationship(back_populates="owner", cascade_delete=True)
 
 
@@ -60,6 +88,135 @@ class UsersPublic(SQLModel):
     count: int
 
 
+# Users by requested id, None for ids that don't exist
+class UsersBatchPublic(SQLModel):
+    data: dict[uuid.UUID, UserPublic | None]
+
+
+# Refresh tokens, stored as the SHA-256 of the token. A login starts a family,
+# each refresh uses up the token and issues the next one of the family
+class RefreshToken(SQLModel, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    token_hash: str = Field(unique=True, index=True, max_length=64)
+    family_id: uuid.UUID = Field(index=True)
+    user_id: uuid.UUID = Field(
+        foreign_key="user.id", nullable=False, ondelete="CASCADE", index=True
+    )
+    # The user's token_version when the family started, it ends on any change
+    token_version: int
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+    expires_at: datetime = Field(
+        sa_type=DateTime(timezone=True),  # type: ignore
+        index=True,
+    )
+    used_at: datetime | None = Field(
+        default=None, sa_type=DateTime(timezone=True)  # type: ignore
+    )
+    revoked_at: datetime | None = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),  # type: ignore
+        index=True,
+    )
+
+
+# Rate limit token buckets shared by the workers, see app/core/ratelimit.py
+class RateLimitBucket(SQLModel, table=True):
+    key: str = Field(primary_key=True, max_length=320)
+    tokens: float
+    updated_at: datetime = Field(
+        sa_type=DateTime(timezone=True),  # type: ignore
+        index=True,
+    )
+
+
+# Emails to send, written in the transaction of the change they are about and
+# sent by the EmailDispatcher, see app/outbox.py
+class EmailOutbox(SQLModel, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Set for the emails of a bulk notification
+    batch_id: uuid.UUID | None = Field(default=None, index=True)
+    email_to: str = Field(max_length=255)
+    subject: str = Field(max_length=998)
+    # Cleared once sent or given up on, reset emails contain a token
+    html_content: str = Field(sa_type=Text)  # type: ignore
+    status: str = Field(default="pending", max_length=20)
+    attempts: int = 0
+    # When the next attempt is due, None once sent or given up on
+    next_attempt_at: datetime | None = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),  # type: ignore
+        index=True,
+    )
+    last_error: str | None = Field(default=None, sa_type=Text)  # type: ignore
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),  # type: ignore
+        index=True,
+    )
+    sent_at: datetime | None = Field(
+        default=None, sa_type=DateTime(timezone=True)  # type: ignore
+    )
+
+
+class NotificationCreate(SQLModel):
+    subject: str = Field(min_length=1, max_length=255)
+    message: str = Field(min_length=1, max_length=10_000)
+
+
+class NotificationBatchPublic(SQLModel):
+    batch_id: uuid.UUID
+    recipients: int
+
+
+class NotificationRecipientPublic(SQLModel):
+    email_to: str
+    status: str
+    attempts: int
+    last_error: str | None
+    sent_at: datetime | None
+
+
+class NotificationBatchStatusPublic(SQLModel):
+    batch_id: uuid.UUID
+    total: int
+    pending: int
+    sent: int
+    failed: int
+    created_at: datetime
+    last_sent_at: datetime | None
+    # Emails sent per second from queueing to the last one sent
+    throughput: float | None
+    recipients: list[NotificationRecipientPublic]
+
+
+# Background deletion of a user's items and then the user, kept after the user
+# is gone so its progress can be reported
+class UserPurge(SQLModel, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    user_id: uuid.UUID = Field(index=True)
+    status: str = Field(default="pending", max_length=20)
+    items_deleted: int = 0
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+    finished_at: datetime | None = Field(
+        default=None, sa_type=DateTime(timezone=True)  # type: ignore
+    )
+
+
+class UserPurgePublic(SQLModel):
+    id: uuid.UUID
+    user_id: uuid.UUID
+    status: str
+    items_deleted: int
+    created_at: datetime
+    finished_at: datetime | None
+
+
 # Shared properties
 class ItemBase(SQLModel):
     title: str = Field(min_length=1, max_length=255)
@@ -78,10 +235,18 @@ class ItemUpdate(ItemBase):
 
 # Database model, database table inferred from class name
 class Item(ItemBase, table=True):
+    __table_args__ = (Index("ix_item_updated_at_id", "updated_at", "id"),)
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     title: str = Field(max_length=255)
     owner_id: uuid.UUID = Field(
-        foreign_key="user.id", nullable=False, ondelete="CASCADE"
+        foreign_key="user.id", nullable=False, ondelete="CASCADE", index=True
+    )
+    # Set by the set_updated_at trigger on every insert and update
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),  # type: ignore
+        sa_column_kwargs={"server_default": func.now()},
     )
     owner: User | None = Relationship(back_populates="items")
 
@@ -97,20 +262,87 @@ class ItemsPublic(SQLModel):
     count: int
 
 
+# Items changed and ids of items deleted since a sync token
+class ItemsChangesPublic(SQLModel):
+    data: list[ItemPublic]
+    deleted: list[uuid.UUID]
+    sync_token: str
+    has_more: bool
+
+
+# Ids of the ItemCount rows adding up to the total number of items. Each
+# connection updates one of them, so item writes don't all wait on one row.
+GLOBAL_ITEM_COUNT_IDS = [uuid.UUID(int=shard) for shard in range(16)]
+
+
+# Number of items per owner, maintained by triggers on the item table
+class ItemCount(SQLModel, table=True):
+    owner_id: uuid.UUID = Field(primary_key=True)
+    count: int = Field(default=0, sa_type=BigInteger)  # type: ignore
+
+
+# Validation errors of one row of a bulk payload, by its index in the payload
+class BulkRowError(SQLModel):
+    index: int
+    errors: list[dict[str, Any]]
+
+
+class ItemsBulkPublic(SQLModel):
+    data: list[ItemPublic]
+    errors: list[BulkRowError]
+
+
+# Ids of deleted rows, recorded by triggers for delta sync clients
+class Tombstone(SQLModel, table=True):
+    __table_args__ = (
+        Index(
+            "ix_tombstone_table_name_deleted_at_id", "table_name", "deleted_at", "id"
+        ),
+    )
+
+    id: int | None = Field(
+        default=None, primary_key=True, sa_type=BigInteger  # type: ignore
+    )
+    table_name: str = Field(max_length=63)
+    record_id: uuid.UUID
+    # Set for tables whose rows are only visible to their owner
+    owner_id: uuid.UUID | None = Field(default=None, index=True)
+    deleted_at: datetime = Field(
+        sa_type=DateTime(timezone=True),  # type: ignore
+        sa_column_kwargs={"server_default": func.now()},
+        index=True,
+    )
+
+
 # Generic message
 class Message(SQLModel):
     message: str
 
 
+class UserDeleted(Message):
+    purge_id: uuid.UUID
+
+
 # JSON payload containing access token
 class Token(SQLModel):
     access_token: str
+    refresh_token: str
     token_type: str = "bearer"
 
 
+class RefreshTokenRequest(SQLModel):
+    refresh_token: str
+
+
 # Contents of JWT token
 class TokenPayload(SQLModel):
-    sub: str | None = None
+    sub: uuid.UUID | None = None
+    # Claims of stateless tokens: is_active, is_superuser and token_version
+    act: bool | None = None
+    su: bool | None = None
+    ver: int | None = None
+    # Family of the refresh token the access token was issued with
+    sid: uuid.UUID | None = None
 
 
 class NewPassword(SQLModel):
@@ -118,58 +350,144 @@ class NewPassword(SQLModel):
     new_password: str = Field(min_length=8, max_length=40)
 
 
+# Weighted full text document of a company, kept by Postgres as a stored
+# generated column. The 'simple' config skips stemming, which suits names.
+COMPANY_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple'::regconfig, name), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, registration_number), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, contact_person), 'B') || "
+    "setweight(to_tsvector('simple'::regconfig, industry), 'C')"
+)
+
+
 class Company(Base):
     __tablename__ = "companies"
+    __table_args__ = (
+        Index("ix_companies_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_companies_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_companies_contact_person_trgm",
+            "contact_person",
+            postgresql_using="gin",
+            postgresql_ops={"contact_person": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_companies_registration_number_trgm",
+            "registration_number",
+            postgresql_using="gin",
+            postgresql_ops={"registration_number": "gin_trgm_ops"},
+        ),
+        Index("ix_companies_updated_at_id", "updated_at", "id"),
+    )
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        server_default=text("gen_random_uuid()"),
+    )
     name = Column(String, nullable=False)
     address = Column(String, nullable=False)
     contact_person = Column(String, nullable=False)
-    email = Column(String, nullable=False)
+    email = Column(String, nullable=False, index=True)
     phone = Column(String, nullable=False)
     industry = Column(String, nullable=False)
-    registration_number = Column(String, nullable=False)
+    registration_number = Column(String, nullable=False, unique=True, index=True)
     employees = Column(Integer, nullable=False)
     website = Column(String)
     logo = Column(String)
+    search_vector = deferred(
+        Column(TSVECTOR, Computed(COMPANY_SEARCH_VECTOR, persisted=True))
+    )
+    # Set by the set_updated_at trigger on every insert and update
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        server_onupdate=FetchedValue(),
+    )
     
-    # Relationships
-    applications = relationship("Application", back_populates="company")
+    # Relationships raise instead of lazy loading, request them with
+    # loader options (joinedload/selectinload) in crud
+    applications = relationship(
+        "Application", back_populates="company", lazy="raise_on_sql", passive_deletes=True
+    )
 
 
 class QMSType(Base):
     __tablename__ = "qms_types"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        server_default=text("gen_random_uuid()"),
+    )
     name = Column(String, nullable=False, unique=True)
     
     # Relationships
-    applications = relationship("Application", back_populates="qms_type")
-    documents = relationship("Document", back_populates="qms_type")
+    applications = relationship(
+        "Application", back_populates="qms_type", lazy="raise_on_sql", passive_deletes=True
+    )
+    documents = relationship(
+        "Document", back_populates="qms_type", lazy="raise_on_sql", passive_deletes=True
+    )
 
 
 class Application(Base):
     __tablename__ = "applications"
+    __table_args__ = (
+        Index(
+            "ix_applications_form_data",
+            "form_data",
+            postgresql_using="gin",
+            postgresql_ops={"form_data": "jsonb_path_ops"},
+        ),
+        Index("ix_applications_updated_at_id", "updated_at", "id"),
+    )
+    __mapper_args__ = {"eager_defaults": True}
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=False)
-    qms_type_id = Column(UUID(as_uuid=True), ForeignKey("qms_types.id"), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    form_data = Column(JSON)
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        server_default=text("gen_random_uuid()"),
+    )
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=False, index=True)
+    qms_type_id = Column(UUID(as_uuid=True), ForeignKey("qms_types.id"), nullable=False, index=True)
+    # Set by the database (server default and update trigger), read back
+    # through RETURNING thanks to eager_defaults
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    updated_at = Column(
+        DateTime,
+        nullable=False,
+        server_default=func.now(),
+        server_onupdate=FetchedValue(),
+    )
+    form_data = Column(JSONB)
     
     # Relationships
-    company = relationship("Company", back_populates="applications")
-    qms_type = relationship("QMSType", back_populates="applications")
+    company = relationship("Company", back_populates="applications", lazy="raise_on_sql")
+    qms_type = relationship("QMSType", back_populates="applications", lazy="raise_on_sql")
 
 
 class Document(Base):
     __tablename__ = "documents"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        server_default=text("gen_random_uuid()"),
+    )
     title = Column(String, nullable=False)
-    qms_type_id = Column(UUID(as_uuid=True), ForeignKey("qms_types.id"), nullable=False)
+    qms_type_id = Column(UUID(as_uuid=True), ForeignKey("qms_types.id"), nullable=False, index=True)
     file_path = Column(String, nullable=False)
     
     # Relationships
-    qms_type = relationship("QMSType", back_populates="documents")
+    qms_type = relationship("QMSType", back_populates="documents", lazy="raise_on_sql")
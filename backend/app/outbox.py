@@ -0,0 +1,97 @@
+"""
+Sends the emails queued in the emailoutbox table. Endpoints queue emails with
+`crud.enqueue_email` in the transaction of the change they are about, so the
+response doesn't wait for the SMTP server and an email is only sent if the
+change was committed.
+
+Every worker runs an `EmailDispatcher`. It claims due emails in batches,
+skipping those claimed by other workers, and sends them over one SMTP
+connection kept open while there is mail to send. Failed emails are retried
+with exponential backoff, up to EMAIL_OUTBOX_MAX_ATTEMPTS attempts.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from emails.backend.smtp import SMTPBackend  # type: ignore
+from sqlalchemy import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.models import EmailOutbox
+from app.utils import send_email, smtp_options
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_SECONDS * 2 ** (attempts - 1))
+
+
+class EmailDispatcher(threading.Thread):
+    def __init__(self, engine: Engine) -> None:
+        super().__init__(name="email-dispatcher", daemon=True)
+        self.engine = engine
+        self.stopped = threading.Event()
+        self.smtp: SMTPBackend | None = None
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            claimed = 0
+            try:
+                if settings.emails_enabled:
+                    claimed = self.dispatch()
+            except SQLAlchemyError:
+                logger.exception("Email dispatcher could not reach the database")
+            if claimed < settings.EMAIL_OUTBOX_BATCH_SIZE:
+                # Caught up, don't hold the SMTP connection while idle
+                self.close()
+                self.stopped.wait(settings.EMAIL_OUTBOX_POLL_SECONDS)
+        self.close()
+
+    def dispatch(self) -> int:
+        """Send a batch of due emails, returns how many were claimed."""
+        with Session(self.engine, expire_on_commit=False) as session:
+            emails = crud.claim_emails(
+                session=session,
+                limit=settings.EMAIL_OUTBOX_BATCH_SIZE,
+                lease=timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS),
+            )
+            for email in emails:
+                self._send(session, email)
+        return len(emails)
+
+    def _send(self, session: Session, email: EmailOutbox) -> None:
+        if self.smtp is None:
+            self.smtp = SMTPBackend(fail_silently=False, **smtp_options())
+        try:
+            send_email(
+                email_to=email.email_to,
+                subject=email.subject,
+                html_content=email.html_content,
+                smtp=self.smtp,
+            )
+        except Exception as exc:
+            # The connection may be unusable, the next email opens a new one
+            self.close()
+            retry_at = None
+            if email.attempts < settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                retry_at = datetime.now(timezone.utc) + retry_delay(email.attempts)
+            logger.warning(f"Sending email {email.id} failed: {exc!r}")
+            crud.mark_email_failed(
+                session=session, email=email, error=repr(exc), retry_at=retry_at
+            )
+        else:
+            crud.mark_email_sent(session=session, email=email)
+
+    def close(self) -> None:
+        if self.smtp is not None:
+            self.smtp.close()
+            self.smtp = None
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
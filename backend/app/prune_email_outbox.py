@@ -0,0 +1,30 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def init() -> None:
+    before = datetime.now(timezone.utc) - timedelta(
+        days=settings.EMAIL_OUTBOX_RETENTION_DAYS
+    )
+    with Session(engine) as session:
+        pruned = crud.prune_email_outbox(session=session, before=before)
+        logger.info(f"Pruned {pruned} queued emails")
+
+
+def main() -> None:
+    logger.info("Pruning the email outbox")
+    init()
+    logger.info("Email outbox pruned")
+
+
+if __name__ == "__main__":
+    main()
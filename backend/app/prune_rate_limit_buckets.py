@@ -0,0 +1,29 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.db import engine
+from app.core.ratelimit import PERIODS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def init() -> None:
+    # Buckets untouched for the longest period are full, as if they were gone
+    before = datetime.now(timezone.utc) - timedelta(seconds=max(PERIODS.values()))
+    with Session(engine) as session:
+        pruned = crud.prune_rate_limit_buckets(session=session, before=before)
+        logger.info(f"Pruned {pruned} rate limit buckets")
+
+
+def main() -> None:
+    logger.info("Pruning rate limit buckets")
+    init()
+    logger.info("Rate limit buckets pruned")
+
+
+if __name__ == "__main__":
+    main()
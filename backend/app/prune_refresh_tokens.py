@@ -0,0 +1,28 @@
+import logging
+from datetime import datetime, timezone
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.db import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def init() -> None:
+    with Session(engine) as session:
+        pruned = crud.prune_refresh_tokens(
+            session=session, before=datetime.now(timezone.utc)
+        )
+        logger.info(f"Pruned {pruned} refresh tokens")
+
+
+def main() -> None:
+    logger.info("Pruning expired refresh tokens")
+    init()
+    logger.info("Refresh tokens pruned")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def init() -> None:
+    # Sync tokens older than the retention are rejected, so their tombstones
+    # are no longer needed
+    before = datetime.now(timezone.utc) - timedelta(
+        days=settings.SYNC_TOMBSTONE_RETENTION_DAYS
+    )
+    with Session(engine) as session:
+        pruned = crud.prune_tombstones(session=session, before=before)
+        logger.info(f"Pruned {pruned} tombstones")
+
+
+def main() -> None:
+    logger.info("Pruning tombstones")
+    init()
+    logger.info("Tombstones pruned")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import logging
+
+from sqlmodel import Session, col, select
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.models import UserPurge
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def init() -> None:
+    # Purges interrupted by a restart are left pending or running
+    with Session(engine) as session:
+        statement = select(UserPurge).where(col(UserPurge.finished_at).is_(None))
+        for purge in session.exec(statement).all():
+            logger.info(f"Resuming purge {purge.id} of user {purge.user_id}")
+            crud.purge_user(
+                session=session,
+                purge=purge,
+                batch_size=settings.USER_PURGE_BATCH_SIZE,
+            )
+
+
+def main() -> None:
+    logger.info("Resuming unfinished user purges")
+    init()
+    logger.info("User purges finished")
+
+
+if __name__ == "__main__":
+    main()
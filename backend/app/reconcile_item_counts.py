@@ -0,0 +1,26 @@
+import logging
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.db import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def init() -> None:
+    with Session(engine) as session:
+        fixed = crud.reconcile_item_counts(session=session)
+        if fixed:
+            logger.warning(f"Fixed {fixed} drifted item counters")
+
+
+def main() -> None:
+    logger.info("Reconciling item counters")
+    init()
+    logger.info("Item counters reconciled")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ from datetime import datetime
 from typing import Optional
 from uuid import UUID
 from pydantic import BaseModel, EmailStr, HttpUrl, constr
+from app.models import BulkRowError
 
 # Company Schemas
 class CompanyBase(BaseModel):
@@ -82,11 +83,20 @@ class Application(ApplicationBase):
     class Config:
         from_attributes = True
 
+class ApplicationExpanded(Application):
+    # Only present when requested with expand=
+    company: Optional[Company] = None
+    qms_type: Optional[QMSType] = None
+
 # Response Models
 class CompanyList(BaseModel):
     items: list[Company]
     total: int
 
+class CompanySearchResults(BaseModel):
+    items: list[Company]
+    has_more: bool
+
 class QMSTypeList(BaseModel):
     items: list[QMSType]
     total: int
@@ -97,4 +107,44 @@ class DocumentList(BaseModel):
 
 class ApplicationList(BaseModel):
     items: list[Application]
-    total: int 
\ No newline at end of file
+    total: int
+
+# Delta sync, rows changed and ids deleted since the sync token
+class CompanyChanges(BaseModel):
+    changed: list[Company]
+    deleted: list[UUID]
+    sync_token: str
+    has_more: bool
+
+class ApplicationChanges(BaseModel):
+    changed: list[Application]
+    deleted: list[UUID]
+    sync_token: str
+    has_more: bool
+
+# Batch lookups, keyed by the requested ids, null for ids that don't exist
+class CompanyBatch(BaseModel):
+    items: dict[UUID, Optional[Company]]
+
+class QMSTypeBatch(BaseModel):
+    items: dict[UUID, Optional[QMSType]]
+
+class DocumentBatch(BaseModel):
+    items: dict[UUID, Optional[Document]]
+
+class CompanyBulkResult(BaseModel):
+    items: list[Company]
+    errors: list[BulkRowError]
+
+class ApplicationBulkResult(BaseModel):
+    items: list[Application]
+    errors: list[BulkRowError]
+
+class CompanyImportResult(BaseModel):
+    inserted: int
+    updated: int
+    # Valid rows superseded by a later row with the same registration number
+    skipped: int
+    # Only the first IMPORT_MAX_ERRORS errors are listed, error_count has them all
+    errors: list[BulkRowError]
+    error_count: int
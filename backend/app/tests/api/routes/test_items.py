@@ -1,10 +1,16 @@
+import csv
+import json
 import uuid
+from datetime import datetime
+from unittest.mock import patch
 
 from fastapi.testclient import TestClient
 from sqlmodel import Session
 
+from app.api.sync import SyncPosition, encode_sync_token
 from app.core.config import settings
 from app.tests.utils.item import create_random_item
+from app.tests.utils.utils import get_query_count
 
 
 def test_create_item(
@@ -24,6 +30,27 @@ def test_create_item(
     assert "owner_id" in content
 
 
+def test_create_items_bulk(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    data = [
+        {"title": "Foo", "description": "Fighters"},
+        {"title": ""},
+        {"title": "Bar"},
+    ]
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert [item["title"] for item in content["data"]] == ["Foo", "Bar"]
+    assert len(content["errors"]) == 1
+    assert content["errors"][0]["index"] == 1
+    assert content["errors"][0]["errors"][0]["loc"] == ["title"]
+
+
 def test_read_item(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -79,6 +106,116 @@ def test_read_items(
     assert len(content["data"]) >= 2
 
 
+def test_read_items_query_count(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 200
+    # current user, count, page
+    assert get_query_count(response) <= 3
+
+
+def test_export_items(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/export",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.iter_lines()]
+    assert {"id": str(item.id), "title": item.title} in [
+        {"id": row["id"], "title": row["title"]} for row in rows
+    ]
+
+
+def test_export_items_csv_only_own_items(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/export",
+        headers=normal_user_token_headers,
+        params={"format": "csv"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(response.text.splitlines()))
+    assert all(row["id"] != str(item.id) for row in rows)
+
+
+def _sync_items(
+    client: TestClient, headers: dict[str, str], token: str | None = None
+) -> tuple[set[str], set[str], str]:
+    changed: set[str] = set()
+    deleted: set[str] = set()
+    while True:
+        params = {"limit": 1000}
+        if token:
+            params["changes_since"] = token
+        response = client.get(
+            f"{settings.API_V1_STR}/items/changes", headers=headers, params=params
+        )
+        assert response.status_code == 200
+        content = response.json()
+        changed |= {item["id"] for item in content["data"]}
+        deleted |= set(content["deleted"])
+        token = content["sync_token"]
+        if not content["has_more"]:
+            return changed, deleted, token
+
+
+def test_read_item_changes(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    with patch("app.core.config.settings.SYNC_SAFETY_WINDOW_SECONDS", 0):
+        item = create_random_item(db)
+        changed, _, token = _sync_items(client, superuser_token_headers)
+        assert str(item.id) in changed
+
+        updated = create_random_item(db)
+        response = client.put(
+            f"{settings.API_V1_STR}/items/{updated.id}",
+            headers=superuser_token_headers,
+            json={"title": "Updated"},
+        )
+        assert response.status_code == 200
+        response = client.delete(
+            f"{settings.API_V1_STR}/items/{item.id}",
+            headers=superuser_token_headers,
+        )
+        assert response.status_code == 200
+
+        changed, deleted, _ = _sync_items(client, superuser_token_headers, token)
+        assert str(updated.id) in changed
+        assert str(item.id) not in changed
+        assert str(item.id) in deleted
+
+
+def test_read_item_changes_invalid_token(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/changes",
+        headers=superuser_token_headers,
+        params={"changes_since": "not-a-token"},
+    )
+    assert response.status_code == 422
+
+    naive = encode_sync_token(SyncPosition(updated=None, deleted=(datetime.now(), 0)))
+    response = client.get(
+        f"{settings.API_V1_STR}/items/changes",
+        headers=superuser_token_headers,
+        params={"changes_since": naive},
+    )
+    assert response.status_code == 422
+
+
 def test_update_item(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -1,11 +1,17 @@
+import threading
 from unittest.mock import patch
 
+import jwt
 from fastapi.testclient import TestClient
+from passlib.hash import bcrypt
 from sqlmodel import Session, select
 
+from app import crud
 from app.core.config import settings
-from app.core.security import verify_password
-from app.models import User
+from app.core.security import ALGORITHM, verify_password
+from app.models import User, UserCreate
+from app.tests.utils.user import user_authentication_headers
+from app.tests.utils.utils import random_email, random_lower_string
 from app.utils import generate_password_reset_token
 
 
@@ -30,6 +36,153 @@ def test_get_access_token_incorrect_password(client: TestClient) -> None:
     assert r.status_code == 400
 
 
+def test_refresh_access_token(client: TestClient, db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    crud.create_user(session=db, user_create=UserCreate(email=email, password=password))
+    r = client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={"username": email, "password": password},
+    )
+    first = r.json()
+
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh",
+        json={"refresh_token": first["refresh_token"]},
+    )
+    assert r.status_code == 200
+    second = r.json()
+    assert second["refresh_token"] != first["refresh_token"]
+    headers = {"Authorization": f"Bearer {second['access_token']}"}
+    r = client.post(f"{settings.API_V1_STR}/login/test-token", headers=headers)
+    assert r.status_code == 200
+
+    # Reusing a refresh token revokes its whole family
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh",
+        json={"refresh_token": first["refresh_token"]},
+    )
+    assert r.status_code == 401
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh",
+        json={"refresh_token": second["refresh_token"]},
+    )
+    assert r.status_code == 401
+    r = client.post(f"{settings.API_V1_STR}/login/test-token", headers=headers)
+    assert r.status_code == 403
+    assert r.json()["detail"] == "Token has been revoked"
+
+
+def test_logout(client: TestClient, db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    crud.create_user(session=db, user_create=UserCreate(email=email, password=password))
+    r = client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={"username": email, "password": password},
+    )
+    tokens = r.json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    r = client.post(
+        f"{settings.API_V1_STR}/logout",
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    assert r.status_code == 200
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert r.status_code == 403
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh",
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    assert r.status_code == 401
+
+
+def test_stateless_access_token_revoked_on_privilege_change(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    email = random_email()
+    password = random_lower_string()
+    user = crud.create_user(
+        session=db, user_create=UserCreate(email=email, password=password)
+    )
+    with patch("app.core.config.settings.STATELESS_AUTH", True):
+        headers = user_authentication_headers(
+            client=client, email=email, password=password
+        )
+        payload = jwt.decode(
+            headers["Authorization"].removeprefix("Bearer "),
+            settings.SECRET_KEY,
+            algorithms=[ALGORITHM],
+        )
+        assert payload["act"] is True
+        assert payload["su"] is False
+        r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+        assert r.status_code == 200
+
+        r = client.patch(
+            f"{settings.API_V1_STR}/users/{user.id}",
+            headers=superuser_token_headers,
+            json={"is_superuser": True},
+        )
+        assert r.status_code == 200
+        r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+        assert r.status_code == 403
+        assert r.json()["detail"] == "Token has been revoked"
+
+
+def test_get_access_token_rehashes_outdated_password(
+    client: TestClient, db: Session
+) -> None:
+    email = random_email()
+    password = random_lower_string()
+    user = User(email=email, hashed_password=bcrypt.hash(password))
+    db.add(user)
+    db.commit()
+    token_version = user.token_version
+
+    login_data = {"username": email, "password": password}
+    r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    assert r.status_code == 200
+
+    db.refresh(user)
+    assert user.hashed_password.startswith("$argon2id$")
+    assert verify_password(password, user.hashed_password)
+    # Same password, the tokens issued before stay valid
+    assert user.token_version == token_version
+    r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    assert r.status_code == 200
+
+
+def test_get_access_token_rate_limited(client: TestClient) -> None:
+    login_data = {"username": random_email(), "password": random_lower_string()}
+    with (
+        patch("app.core.config.settings.RATE_LIMIT_ENABLED", True),
+        patch("app.core.config.settings.RATE_LIMITS", {"login:account": "1/minute"}),
+    ):
+        r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+        assert r.status_code == 400
+        with patch("app.crud.verify_password") as verify:
+            r = client.post(
+                f"{settings.API_V1_STR}/login/access-token", data=login_data
+            )
+        assert r.status_code == 429
+        assert int(r.headers["Retry-After"]) > 0
+        verify.assert_not_called()
+
+
+def test_get_access_token_hashing_busy(client: TestClient) -> None:
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    with patch("app.core.security._hash_slots", threading.BoundedSemaphore(1)) as slots:
+        slots.acquire()
+        r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)
+
+
 def test_use_access_token(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -1,4 +1,6 @@
+import csv
 import uuid
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch
 
 from fastapi.testclient import TestClient
@@ -7,7 +9,8 @@ from sqlmodel import Session, select
 from app import crud
 from app.core.config import settings
 from app.core.security import verify_password
-from app.models import User, UserCreate
+from app.models import ItemCreate, User, UserCreate
+from app.tests.utils.user import create_random_user, user_authentication_headers
 from app.tests.utils.utils import random_email, random_lower_string
 
 
@@ -168,6 +171,82 @@ def test_retrieve_users(
         assert "email" in item
 
 
+def test_export_users(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = create_random_user(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/users/export",
+        headers=superuser_token_headers,
+        params={"format": "csv"},
+    )
+    assert response.status_code == 200
+    rows = list(csv.DictReader(response.text.splitlines()))
+    assert user.email in [row["email"] for row in rows]
+    assert "hashed_password" not in rows[0]
+
+
+def test_export_users_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/users/export",
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 403
+
+
+def test_read_users_batch(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = create_random_user(db)
+    missing_id = uuid.uuid4()
+    response = client.get(
+        f"{settings.API_V1_STR}/users/batch",
+        headers=superuser_token_headers,
+        params={"ids": [str(user.id), str(missing_id)]},
+    )
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data[str(user.id)]["email"] == user.email
+    assert data[str(missing_id)] is None
+
+
+def test_read_users_batch_too_many_ids(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    ids = [str(uuid.uuid4()) for _ in range(settings.BATCH_GET_MAX_IDS + 1)]
+    response = client.get(
+        f"{settings.API_V1_STR}/users/batch",
+        headers=superuser_token_headers,
+        params={"ids": ids},
+    )
+    assert response.status_code == 422
+
+
+def test_update_user_invalidates_cached_principal(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    email = random_email()
+    password = random_lower_string()
+    user = crud.create_user(
+        session=db, user_create=UserCreate(email=email, password=password)
+    )
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 200
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+        json={"is_active": False},
+    )
+    assert r.status_code == 200
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Inactive user"
+
+
 def test_update_user_me(
     client: TestClient, normal_user_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -444,6 +523,87 @@ def test_delete_user_super_user(
     assert result is None
 
 
+def test_delete_user_purges_items(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = create_random_user(db)
+    for _ in range(3):
+        item_in = ItemCreate(title=random_lower_string())
+        crud.create_item(session=db, item_in=item_in, owner_id=user.id)
+    r = client.delete(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    purge_id = r.json()["purge_id"]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/purges/{purge_id}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    purge = r.json()
+    assert purge["user_id"] == str(user.id)
+    assert purge["status"] == "done"
+    assert purge["items_deleted"] == 3
+    assert purge["finished_at"]
+
+
+def test_delete_user_being_purged_returns_its_purge(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = create_random_user(db)
+    purge = crud.create_user_purge(session=db, db_user=user)
+
+    r = client.delete(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    assert r.json()["purge_id"] == str(purge.id)
+    # No second purge was started
+    db.refresh(purge)
+    assert purge.status == "pending"
+    crud.purge_user(session=db, purge=purge, batch_size=10)
+
+
+def test_delete_user_resumes_interrupted_purge(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = create_random_user(db)
+    purge = crud.create_user_purge(session=db, db_user=user)
+    purge.created_at = datetime.now(timezone.utc) - timedelta(
+        seconds=settings.USER_PURGE_RESUME_AFTER_SECONDS + 1
+    )
+    db.add(purge)
+    db.commit()
+
+    r = client.delete(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    assert r.json()["purge_id"] == str(purge.id)
+    db.refresh(purge)
+    assert purge.status == "done"
+
+
+def test_retrieve_users_hides_users_being_purged(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = create_random_user(db)
+    purge = crud.create_user_purge(session=db, db_user=user)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"limit": 10_000},
+    )
+    assert r.status_code == 200
+    assert str(user.id) not in {u["id"] for u in r.json()["data"]}
+    crud.purge_user(session=db, purge=purge, batch_size=10)
+
+
 def test_delete_user_not_found(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
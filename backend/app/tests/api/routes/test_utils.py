@@ -0,0 +1,41 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models import EmailOutbox
+from app.tests.utils.utils import random_email
+
+
+def test_test_email_is_queued(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    email_to = random_email()
+    r = client.post(
+        f"{settings.API_V1_STR}/utils/test-email/",
+        headers=superuser_token_headers,
+        params={"email_to": email_to},
+    )
+    assert r.status_code == 201
+    email = db.exec(select(EmailOutbox).where(EmailOutbox.email_to == email_to)).one()
+    assert email.status == "pending"
+    assert settings.PROJECT_NAME in email.subject
+
+
+def test_read_metrics(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/metrics/", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    assert "# TYPE password_hash_seconds histogram" in r.text
+    assert "password_hash_queue_depth " in r.text
+
+
+def test_read_metrics_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/metrics/", headers=normal_user_token_headers
+    )
+    assert r.status_code == 403
@@ -0,0 +1,30 @@
+import uuid
+
+from sqlmodel import Session
+
+from app.api.v1.endpoints import applications
+from app.tests.utils.company import create_random_company, create_random_qms_type
+
+
+def test_create_applications_bulk(db: Session) -> None:
+    company = create_random_company(db)
+    qms_type = create_random_qms_type(db)
+    valid = {
+        "company_id": str(company.id),
+        "qms_type_id": str(qms_type.id),
+        "form_data": {"scope": "ISO 9001"},
+    }
+    rows = [
+        valid,
+        {"company_id": str(company.id), "qms_type_id": str(qms_type.id)},
+        {**valid, "company_id": str(uuid.uuid4())},
+        {**valid, "qms_type_id": str(uuid.uuid4())},
+    ]
+    result = applications.create_applications(db=db, applications_in=rows)
+    assert len(result["items"]) == 1
+    assert result["items"][0]["company_id"] == company.id
+    assert result["items"][0]["form_data"] == {"scope": "ISO 9001"}
+    assert [error.index for error in result["errors"]] == [1, 2, 3]
+    assert result["errors"][0].errors[0]["loc"] == ("form_data",)
+    assert result["errors"][1].errors[0]["msg"] == "Company not found"
+    assert result["errors"][2].errors[0]["msg"] == "QMS type not found"
@@ -0,0 +1,47 @@
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session
+
+from app import schemas
+from app.api.v1.endpoints import companies
+from app.tests.utils.company import create_random_company, random_company_data
+
+
+def test_create_companies_bulk(db: Session) -> None:
+    valid = [random_company_data(), random_company_data()]
+    invalid = {**random_company_data(), "employees": "many"}
+    result = companies.create_companies(
+        db=db, companies_in=[valid[0], invalid, valid[1]]
+    )
+    assert [company["name"] for company in result["items"]] == [
+        company["name"] for company in valid
+    ]
+    assert result["items"][0]["website"] == "https://example.com/"
+    assert [error.index for error in result["errors"]] == [1]
+    assert result["errors"][0].errors[0]["loc"] == ("employees",)
+
+
+def test_create_companies_bulk_reports_taken_registration_numbers(
+    db: Session,
+) -> None:
+    existing = create_random_company(db)
+    new = random_company_data()
+    rows = [
+        {**random_company_data(), "registration_number": existing.registration_number},
+        new,
+        {**random_company_data(), "registration_number": new["registration_number"]},
+    ]
+    result = companies.create_companies(db=db, companies_in=rows)
+    assert [company["name"] for company in result["items"]] == [new["name"]]
+    assert [error.index for error in result["errors"]] == [0, 2]
+    assert result["errors"][0].errors[0]["type"] == "conflict"
+
+
+def test_create_company_with_taken_registration_number(db: Session) -> None:
+    existing = create_random_company(db)
+    company_in = schemas.CompanyCreate(
+        **{**random_company_data(), "registration_number": existing.registration_number}
+    )
+    with pytest.raises(HTTPException) as exc_info:
+        companies.create_company(db=db, company_in=company_in)
+    assert exc_info.value.status_code == 409
@@ -1,4 +1,5 @@
 from collections.abc import Generator
+from unittest.mock import patch
 
 import pytest
 from fastapi.testclient import TestClient
@@ -24,6 +25,21 @@ def db() -> Generator[Session, None, None]:
         session.commit()
 
 
+@pytest.fixture(scope="session", autouse=True)
+def disable_rate_limits() -> Generator[None, None, None]:
+    # Tests log in far more often than the limits allow, the rate limit tests
+    # enable them again
+    with patch("app.core.config.settings.RATE_LIMIT_ENABLED", False):
+        yield
+
+
+@pytest.fixture(scope="session", autouse=True)
+def disable_email_dispatcher() -> Generator[None, None, None]:
+    # Tests that send emails run the dispatcher themselves
+    with patch("app.core.config.settings.EMAIL_DISPATCHER_ENABLED", False):
+        yield
+
+
 @pytest.fixture(scope="module")
 def client() -> Generator[TestClient, None, None]:
     with TestClient(app) as c:
@@ -0,0 +1,19 @@
+import uuid
+
+from app.core.bloom import BloomFilter
+
+
+def test_bloom_filter_contains_added_keys() -> None:
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [uuid.uuid4().bytes for _ in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+
+
+def test_bloom_filter_false_positive_rate() -> None:
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for _ in range(1000):
+        bloom.add(uuid.uuid4().bytes)
+    false_positives = sum(uuid.uuid4().bytes in bloom for _ in range(10_000))
+    assert false_positives < 300
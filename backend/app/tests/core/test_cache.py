@@ -0,0 +1,43 @@
+from unittest.mock import patch
+
+from app.core.cache import TTLCache
+
+
+def test_ttl_cache_expires_entries() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=60)
+    with patch("app.core.cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+    with patch("app.core.cache.time.monotonic", return_value=160.0):
+        assert cache.get("a") is None
+
+
+def test_ttl_cache_entry_ttl_is_capped() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=60)
+    with patch("app.core.cache.time.monotonic", return_value=100.0):
+        cache.set("short", 1, ttl=10)
+        cache.set("long", 2, ttl=600)
+    with patch("app.core.cache.time.monotonic", return_value=120.0):
+        assert cache.get("short") is None
+        assert cache.get("long") == 2
+    with patch("app.core.cache.time.monotonic", return_value=160.0):
+        assert cache.get("long") is None
+
+
+def test_ttl_cache_evicts_least_recently_used() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_pop() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.pop("a")
+    cache.pop("missing")
+    assert cache.get("a") is None
@@ -0,0 +1,21 @@
+import pytest
+from sqlalchemy import Column, MetaData, Table
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.core.form_filters import FilterError, compile_filter
+
+form_data = Table("applications", MetaData(), Column("form_data", JSONB)).c.form_data
+
+
+def test_equality_compiles_to_containment() -> None:
+    predicate = compile_filter(form_data, "site.count=3")
+    compiled = predicate.compile(dialect=postgresql.dialect())
+    assert "@>" in str(compiled)
+    assert compiled.params == {"form_data_1": {"site": {"count": 3}}}
+
+
+@pytest.mark.parametrize("expression", ["site.count>=3", "scope!=ISO 9001"])
+def test_comparisons_are_rejected(expression: str) -> None:
+    with pytest.raises(FilterError, match="only = is supported"):
+        compile_filter(form_data, expression)
@@ -0,0 +1,42 @@
+import uuid
+from unittest.mock import patch
+
+from sqlmodel import Session
+
+from app.core import principals
+from app.core.principals import (
+    cache_principal,
+    get_cached_principal,
+    invalidate_principal,
+    principal_generation,
+)
+from app.models import User
+
+
+def make_user() -> User:
+    return User(id=uuid.uuid4(), email="cached@example.com", hashed_password="x")
+
+
+def test_cached_principal_is_rebuilt_from_columns(db: Session) -> None:
+    user = make_user()
+    with patch.object(principals, "_listening") as listening:
+        listening.is_set.return_value = True
+        cache_principal(user, principal_generation(user.id))
+        with Session(db.get_bind()) as session:
+            cached = get_cached_principal(session, user.id)
+            assert cached is not None
+            assert cached.email == user.email
+            assert session.get(User, user.id) is cached
+    principals.principal_cache.pop(user.id)
+
+
+def test_invalidated_principal_is_not_cached(db: Session) -> None:
+    user = make_user()
+    with patch.object(principals, "_listening") as listening:
+        listening.is_set.return_value = True
+        generation = principal_generation(user.id)
+        # Another transaction changes the user after it was loaded
+        invalidate_principal(db, user.id)
+        db.rollback()
+        cache_principal(user, generation)
+        assert principals.principal_cache.get(user.id) is None
@@ -0,0 +1,59 @@
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from app.core.db import engine
+from app.core.ratelimit import (
+    MemoryBucketStore,
+    PostgresBucketStore,
+    Rate,
+    RateLimiter,
+    RateLimitExceeded,
+    parse_rate,
+)
+
+
+def test_parse_rate() -> None:
+    assert parse_rate("10/minute") == Rate(capacity=10, period=60)
+    with pytest.raises(ValueError):
+        parse_rate("10/fortnight")
+    with pytest.raises(ValueError):
+        parse_rate("0/second")
+
+
+def test_memory_bucket_store_refills() -> None:
+    store = MemoryBucketStore()
+    rate = Rate(capacity=2, period=60)
+    with patch("app.core.ratelimit.time.monotonic", return_value=100.0):
+        assert store.consume("key", rate) == 0
+        assert store.consume("key", rate) == 0
+        assert store.consume("key", rate) == pytest.approx(30)
+    with patch("app.core.ratelimit.time.monotonic", return_value=130.0):
+        assert store.consume("key", rate) == 0
+        assert store.consume("key", rate) > 0
+
+
+def test_postgres_bucket_store() -> None:
+    store = PostgresBucketStore(engine)
+    key = f"test:{uuid.uuid4()}"
+    rate = Rate(capacity=2, period=3600)
+    assert store.consume(key, rate) == 0
+    assert store.consume(key, rate) == 0
+    assert store.consume(key, rate) == pytest.approx(1800)
+
+
+def test_rate_limiter_checks_ip_and_account() -> None:
+    limiter = RateLimiter(MemoryBucketStore())
+    limits = {"login:ip": "3/minute", "login:account": "1/minute"}
+    with (
+        patch("app.core.config.settings.RATE_LIMIT_ENABLED", True),
+        patch("app.core.config.settings.RATE_LIMITS", limits),
+    ):
+        limiter.check("login", ip="10.0.0.1", account="a@example.com")
+        with pytest.raises(RateLimitExceeded):
+            limiter.check("login", ip="10.0.0.1", account="A@example.com")
+        limiter.check("login", ip="10.0.0.1", account="b@example.com")
+        with pytest.raises(RateLimitExceeded):
+            limiter.check("login", ip="10.0.0.1", account="c@example.com")
+        limiter.check("signup", ip="10.0.0.1")
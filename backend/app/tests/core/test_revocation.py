@@ -0,0 +1,26 @@
+import uuid
+from unittest.mock import MagicMock
+
+from app.core.revocation import RevokedSessions
+
+
+def test_families_added_during_load_are_kept() -> None:
+    revoked = RevokedSessions()
+    loaded, added = uuid.uuid4(), uuid.uuid4()
+
+    def snapshot() -> list[uuid.UUID]:
+        # Revoked and added after the snapshot was taken, before the swap
+        revoked.add(added)
+        return [loaded]
+
+    session = MagicMock()
+    session.scalars.return_value.all.side_effect = snapshot
+    revoked.load(session)
+
+    session = MagicMock()
+    session.scalar.return_value = None
+    assert revoked.is_revoked(session, uuid.uuid4()) is False
+    session.scalar.return_value = 1
+    assert revoked.is_revoked(session, loaded) is True
+    assert revoked.is_revoked(session, added) is True
+    assert session.scalar.call_count == 2
@@ -0,0 +1,74 @@
+from sqlmodel import Session
+
+from app import crud
+from app.models import GLOBAL_ITEM_COUNT_IDS, ItemCount, ItemCreate
+from app.tests.utils.item import create_random_item
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_lower_string
+
+
+def test_item_count_follows_writes(db: Session) -> None:
+    user = create_random_user(db)
+    total = crud.get_item_count(session=db)
+    items_in = [ItemCreate(title=random_lower_string()) for _ in range(3)]
+    crud.create_items(session=db, items_in=items_in, owner_id=user.id)
+    assert crud.get_item_count(session=db, owner_id=user.id) == 3
+    assert crud.get_item_count(session=db) == total + 3
+
+    item = create_random_item(db)
+    item.owner_id = user.id
+    db.add(item)
+    db.commit()
+    assert crud.get_item_count(session=db, owner_id=user.id) == 4
+    assert crud.get_item_count(session=db) == total + 4
+
+    db.delete(item)
+    db.commit()
+    assert crud.get_item_count(session=db, owner_id=user.id) == 3
+    assert crud.get_item_count(session=db) == total + 3
+
+
+def test_reconcile_item_counts(db: Session) -> None:
+    item = create_random_item(db)
+    item_count = db.get(ItemCount, item.owner_id)
+    assert item_count
+    item_count.count = 42
+    db.add(item_count)
+    db.commit()
+
+    assert crud.reconcile_item_counts(session=db) >= 1
+    db.expire_all()
+    assert crud.get_item_count(session=db, owner_id=item.owner_id) == 1
+    assert crud.reconcile_item_counts(session=db) == 0
+
+
+def test_reconcile_item_counts_fixes_global_shards(db: Session) -> None:
+    create_random_item(db)
+    crud.reconcile_item_counts(session=db)
+    db.expire_all()
+    total = crud.get_item_count(session=db)
+    shard = db.get(ItemCount, GLOBAL_ITEM_COUNT_IDS[-1]) or ItemCount(
+        owner_id=GLOBAL_ITEM_COUNT_IDS[-1]
+    )
+    shard.count += 5
+    db.add(shard)
+    db.commit()
+    assert crud.get_item_count(session=db) == total + 5
+
+    assert crud.reconcile_item_counts(session=db) == 1
+    assert crud.get_item_count(session=db) == total
+
+
+def test_reconcile_item_counts_ignores_empty_counters(db: Session) -> None:
+    crud.reconcile_item_counts(session=db)
+    item = create_random_item(db)
+    db.delete(item)
+    db.commit()
+    item_count = db.get(ItemCount, item.owner_id)
+    assert item_count
+    assert item_count.count == 0
+
+    # Removed, but it was right
+    assert crud.reconcile_item_counts(session=db) == 0
+    db.expire_all()
+    assert db.get(ItemCount, item.owner_id) is None
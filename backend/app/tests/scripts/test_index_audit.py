@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Index, Integer, MetaData, Table, func
+
+from app.index_audit import (
+    PREDICATE_SOURCES,
+    MissingIndex,
+    _metadata_leading_columns,
+    audit,
+    find_predicate_columns,
+    render_migration,
+)
+
+
+def test_find_predicate_columns() -> None:
+    columns = find_predicate_columns(PREDICATE_SOURCES)
+    assert ("Item", "owner_id") in columns
+    assert ("User", "email") in columns
+
+
+def test_audit_metadata_has_no_missing_indexes() -> None:
+    assert audit() == []
+
+
+def test_metadata_leading_columns_skips_expression_indexes() -> None:
+    table = Table(
+        "thing",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("owner_id", Integer),
+        Index("ix_thing_lower", func.lower("name")),
+        Index("ix_thing_owner_id", "owner_id"),
+    )
+    assert _metadata_leading_columns(table) == {"id", "owner_id"}
+
+
+def test_render_migration() -> None:
+    migration = render_migration(
+        [MissingIndex("item", "owner_id", "foreign key")],
+        revision="abc123",
+        down_revision="def456",
+    )
+    assert "down_revision = 'def456'" in migration
+    assert "op.create_index('ix_item_owner_id', 'item', ['owner_id']" in migration
+    assert "postgresql_concurrently=True" in migration
+    compile(migration, "migration.py", "exec")
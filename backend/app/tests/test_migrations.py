@@ -7,7 +7,8 @@ def test_migrations(db: Session) -> None:
     result = db.execute(text("SELECT * FROM companies LIMIT 1"))
     assert result.keys() == [
         'id', 'name', 'address', 'contact_person', 'email', 'phone',
-        'industry', 'registration_number', 'employees', 'website', 'logo'
+        'industry', 'registration_number', 'employees', 'website', 'logo',
+        'search_vector', 'updated_at'
     ]
 
     # Test QMS types table
@@ -0,0 +1,135 @@
+from collections.abc import Generator
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, col, func, select
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.models import EmailOutbox, User
+from app.outbox import EmailDispatcher
+from app.tests.utils.smtp import SMTPSink, smtp_sink
+from app.tests.utils.utils import random_email
+
+
+@pytest.fixture
+def sink() -> Generator[SMTPSink, None, None]:
+    with (
+        smtp_sink() as sink,
+        patch("app.core.config.settings.SMTP_HOST", sink.host),
+        patch("app.core.config.settings.SMTP_PORT", sink.port),
+        patch("app.core.config.settings.SMTP_TLS", False),
+        patch("app.core.config.settings.EMAILS_FROM_EMAIL", "noreply@example.com"),
+    ):
+        yield sink
+
+
+def _enqueue(db: Session, count: int) -> list[EmailOutbox]:
+    emails = [
+        crud.enqueue_email(
+            session=db,
+            email_to=random_email(),
+            subject=f"Outbox test {i}",
+            html_content="<p>Hello</p>",
+        )
+        for i in range(count)
+    ]
+    db.commit()
+    return emails
+
+
+def test_dispatcher_sends_over_one_connection(db: Session, sink: SMTPSink) -> None:
+    emails = _enqueue(db, 3)
+    dispatcher = EmailDispatcher(engine)
+    while dispatcher.dispatch():
+        pass
+    dispatcher.close()
+
+    assert sink.connections == 1
+    for email in emails:
+        db.refresh(email)
+        assert email.status == "sent"
+        assert email.sent_at
+        assert email.next_attempt_at is None
+        assert email.html_content == ""
+        assert any(email.email_to.encode() in message for message in sink.messages)
+
+
+def test_dispatcher_retries_with_backoff(db: Session, sink: SMTPSink) -> None:
+    (email,) = _enqueue(db, 1)
+    dispatcher = EmailDispatcher(engine)
+    with patch("app.core.config.settings.SMTP_PORT", 1):
+        dispatcher.dispatch()
+    db.refresh(email)
+    assert email.status == "pending"
+    assert email.attempts == 1
+    assert email.last_error
+    assert email.next_attempt_at
+    assert email.next_attempt_at > datetime.now(timezone.utc)
+
+    # Due again
+    email.next_attempt_at = datetime.now(timezone.utc)
+    db.add(email)
+    db.commit()
+    with (
+        patch("app.core.config.settings.SMTP_PORT", 1),
+        patch("app.core.config.settings.EMAIL_OUTBOX_MAX_ATTEMPTS", 2),
+    ):
+        dispatcher.dispatch()
+    db.refresh(email)
+    assert email.status == "failed"
+    assert email.attempts == 2
+    assert email.next_attempt_at is None
+    assert email.html_content == ""
+    assert not sink.messages
+
+
+def test_prune_email_outbox(db: Session) -> None:
+    old, new = _enqueue(db, 2)
+    old.created_at = datetime.now(timezone.utc) - timedelta(days=8)
+    db.add(old)
+    db.commit()
+    pruned = crud.prune_email_outbox(
+        session=db, before=datetime.now(timezone.utc) - timedelta(days=7)
+    )
+    assert pruned >= 1
+    assert db.get(EmailOutbox, old.id) is None
+    assert db.get(EmailOutbox, new.id) is not None
+
+
+def test_notification_batch_status(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    sink: SMTPSink,
+) -> None:
+    active_users = db.exec(
+        select(func.count()).select_from(User).where(col(User.is_active))
+    ).one()
+    r = client.post(
+        f"{settings.API_V1_STR}/users/notify",
+        headers=superuser_token_headers,
+        json={"subject": "Maintenance", "message": "Down on Sunday."},
+    )
+    assert r.status_code == 200
+    batch = r.json()
+    assert batch["recipients"] == active_users
+    status_url = f"{settings.API_V1_STR}/utils/notifications/{batch['batch_id']}"
+    r = client.get(status_url, headers=superuser_token_headers)
+    assert r.json()["pending"] == active_users
+
+    dispatcher = EmailDispatcher(engine)
+    while dispatcher.dispatch():
+        pass
+    dispatcher.close()
+
+    r = client.get(status_url, headers=superuser_token_headers)
+    status = r.json()
+    assert status["sent"] == status["total"] == active_users
+    assert status["pending"] == status["failed"] == 0
+    assert status["throughput"] > 0
+    assert len(sink.messages) >= active_users
+    assert {recipient["status"] for recipient in status["recipients"]} == {"sent"}
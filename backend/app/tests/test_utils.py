@@ -0,0 +1,60 @@
+from app.core.config import settings
+from app.utils import (
+    SharedEmailTemplate,
+    email_templates,
+    generate_notification_emails,
+    generate_test_email,
+    load_email_templates,
+)
+
+
+def test_email_templates_are_compiled_once() -> None:
+    load_email_templates()
+    template = email_templates.get_template("test_email.html")
+    assert email_templates.get_template("test_email.html") is template
+
+    email_data = generate_test_email("test@example.com")
+    assert settings.PROJECT_NAME in email_data.html_content
+    assert "test@example.com" in email_data.html_content
+
+
+def test_shared_email_template_substitutes_recipient_fields() -> None:
+    template = SharedEmailTemplate(
+        template_name="notification.html",
+        context={"project_name": "Project", "subject": "News", "message": "Hi all"},
+        recipient_fields=["name"],
+    )
+    html_content = template.render({"name": "Ann & Bob"})
+    assert "Hello Ann &amp; Bob," in html_content
+    assert "Hi all" in html_content
+    assert "[[name:" not in html_content
+
+
+def test_shared_email_template_escapes_context() -> None:
+    template = SharedEmailTemplate(
+        template_name="notification.html",
+        context={
+            "project_name": "Project",
+            "subject": "<b>News</b>",
+            "message": '<a href="https://example.com">Click</a>',
+        },
+        recipient_fields=["name"],
+    )
+    html_content = template.render({"name": "Ann"})
+    assert "&lt;b&gt;News&lt;/b&gt;" in html_content
+    assert "<a href=" not in html_content
+
+
+def test_generate_notification_emails() -> None:
+    emails = dict(
+        generate_notification_emails(
+            subject="Templates updated",
+            message="The ISO 9001 templates changed.",
+            recipients=[("a@example.com", "Ann"), ("b@example.com", None)],
+        )
+    )
+    assert emails["a@example.com"].subject == (
+        f"{settings.PROJECT_NAME} - Templates updated"
+    )
+    assert "Hello Ann," in emails["a@example.com"].html_content
+    assert "Hello b@example.com," in emails["b@example.com"].html_content
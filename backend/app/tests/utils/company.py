@@ -0,0 +1,28 @@
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.tests.utils.utils import random_email, random_lower_string
+
+
+def random_company_data() -> dict[str, Any]:
+    return {
+        "name": random_lower_string(),
+        "address": "1 Main Street",
+        "contact_person": "Jane Doe",
+        "email": random_email(),
+        "phone": "+1 555 0100",
+        "industry": "Manufacturing",
+        "registration_number": random_lower_string(),
+        "employees": 10,
+        "website": "https://example.com/",
+    }
+
+
+def create_random_company(db: Session) -> models.Company:
+    return crud.create_company(db=db, company_data=random_company_data())
+
+
+def create_random_qms_type(db: Session) -> models.QMSType:
+    return crud.create_qms_type(db=db, qms_type_data={"name": random_lower_string()})
@@ -0,0 +1,64 @@
+import socketserver
+import threading
+from collections.abc import Generator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+
+@dataclass
+class SMTPSink:
+    """Messages received by a local SMTP server, and the connections made."""
+
+    host: str
+    port: int
+    messages: list[bytes] = field(default_factory=list)
+    connections: int = 0
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    server: "_SMTPServer"
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        self.server.sink.connections += 1
+        self.reply("220 localhost SMTP sink")
+        for raw in self.rfile:
+            command = raw.decode().strip().upper()
+            if command.startswith("EHLO"):
+                self.reply("250 localhost")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for line in self.rfile:
+                    if line == b".\r\n":
+                        break
+                    lines.append(line)
+                self.server.sink.messages.append(b"".join(lines))
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                # HELO, MAIL, RCPT, RSET and NOOP
+                self.reply("250 OK")
+
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    sink: SMTPSink
+
+
+@contextmanager
+def smtp_sink() -> Generator[SMTPSink, None, None]:
+    """An SMTP server on localhost that accepts and keeps every message."""
+    with _SMTPServer(("127.0.0.1", 0), _SMTPHandler) as server:
+        host, port = server.server_address[:2]
+        server.sink = SMTPSink(host=str(host), port=int(port))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield server.sink
+        finally:
+            server.shutdown()
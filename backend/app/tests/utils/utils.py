@@ -1,6 +1,8 @@
 import random
+import re
 import string
 
+import httpx
 from fastapi.testclient import TestClient
 
 from app.core.config import settings
@@ -14,6 +16,14 @@ def random_email() -> str:
     return f"{random_lower_string()}@{random_lower_string()}.com"
 
 
+def get_query_count(response: httpx.Response) -> int:
+    match = re.search(
+        r'db;dur=[\d.]+;desc="(\d+) queries"', response.headers["server-timing"]
+    )
+    assert match, "Server-Timing header has no db metric"
+    return int(match.group(1))
+
+
 def get_superuser_token_headers(client: TestClient) -> dict[str, str]:
     login_data = {
         "username": settings.FIRST_SUPERUSER,
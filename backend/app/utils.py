@@ -1,20 +1,34 @@
+import html
 import logging
+import re
+import secrets
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, TypeVar
 
 import emails  # type: ignore
 import jwt
-from jinja2 import Template
+from emails.backend.smtp import SMTPBackend  # type: ignore
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    select_autoescape,
+)
 from jwt.exceptions import InvalidTokenError
+from pydantic import BaseModel, ValidationError
 
 from app.core import security
 from app.core.config import settings
+from app.models import BulkRowError
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
 
 @dataclass
 class EmailData:
@@ -22,36 +36,89 @@ class EmailData:
     subject: str
 
 
+EMAIL_TEMPLATES_DIR = Path(__file__).parent / "email-templates" / "build"
+
+# Templates are compiled once per process and kept in memory, the bytecode
+# cache spares new workers the parsing
+email_templates = Environment(
+    loader=FileSystemLoader(EMAIL_TEMPLATES_DIR),
+    bytecode_cache=FileSystemBytecodeCache(),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=settings.EMAIL_TEMPLATES_AUTO_RELOAD,
+)
+
+
+def load_email_templates() -> None:
+    """Compile every email template, so the first emails don't pay for it."""
+    for template_name in email_templates.list_templates():
+        email_templates.get_template(template_name)
+
+
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "email-templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
+    html_content = email_templates.get_template(template_name).render(context)
     return html_content
 
 
+class SharedEmailTemplate:
+    """
+    A template rendered once for many recipients, with the fields that differ
+    per recipient left as markers that `render` substitutes.
+    """
+
+    def __init__(
+        self,
+        *,
+        template_name: str,
+        context: dict[str, Any],
+        recipient_fields: list[str],
+    ) -> None:
+        token = secrets.token_hex(8)
+        markers = {f"[[{field}:{token}]]": field for field in recipient_fields}
+        self._fields = markers
+        self._pattern = re.compile("|".join(re.escape(marker) for marker in markers))
+        self.html_content = render_email_template(
+            template_name=template_name,
+            context=context | {field: marker for marker, field in markers.items()},
+        )
+
+    def render(self, recipient: dict[str, str]) -> str:
+        return self._pattern.sub(
+            lambda match: html.escape(recipient[self._fields[match.group()]]),
+            self.html_content,
+        )
+
+
+def smtp_options() -> dict[str, Any]:
+    options: dict[str, Any] = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
+    if settings.SMTP_TLS:
+        options["tls"] = True
+    elif settings.SMTP_SSL:
+        options["ssl"] = True
+    if settings.SMTP_USER:
+        options["user"] = settings.SMTP_USER
+    if settings.SMTP_PASSWORD:
+        options["password"] = settings.SMTP_PASSWORD
+    return options
+
+
 def send_email(
     *,
     email_to: str,
     subject: str = "",
     html_content: str = "",
+    smtp: SMTPBackend | None = None,
 ) -> None:
+    """
+    Send an email right away, over `smtp` if given so its connection is
+    reused. Endpoints queue emails with `crud.enqueue_email` instead.
+    """
     assert settings.emails_enabled, "no provided configuration for email variables"
     message = emails.Message(
         subject=subject,
         html=html_content,
         mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
     )
-    smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
-    if settings.SMTP_TLS:
-        smtp_options["tls"] = True
-    elif settings.SMTP_SSL:
-        smtp_options["ssl"] = True
-    if settings.SMTP_USER:
-        smtp_options["user"] = settings.SMTP_USER
-    if settings.SMTP_PASSWORD:
-        smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
+    response = message.send(to=email_to, smtp=smtp or smtp_options())
     logger.info(f"send email result: {response}")
 
 
@@ -82,9 +149,8 @@ def generate_reset_password_email(email_to: str, email: str, token: str) -> Emai
     return EmailData(html_content=html_content, subject=subject)
 
 
-def generate_new_account_email(
-    email_to: str, username: str, password: str
-) -> EmailData:
+def generate_new_account_email(email_to: str, username: str) -> EmailData:
+    # Without the password, the email is stored in the outbox until it is sent
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - New account for user {username}"
     html_content = render_email_template(
@@ -92,7 +158,6 @@ def generate_new_account_email(
         context={
             "project_name": settings.PROJECT_NAME,
             "username": username,
-            "password": password,
             "email": email_to,
             "link": settings.FRONTEND_HOST,
         },
@@ -100,6 +165,24 @@ def generate_new_account_email(
     return EmailData(html_content=html_content, subject=subject)
 
 
+def generate_notification_emails(
+    *, subject: str, message: str, recipients: Iterable[tuple[str, str | None]]
+) -> Iterator[tuple[str, EmailData]]:
+    """The same notification for each (email, name) of `recipients`."""
+    project_name = settings.PROJECT_NAME
+    template = SharedEmailTemplate(
+        template_name="notification.html",
+        context={"project_name": project_name, "subject": subject, "message": message},
+        recipient_fields=["name"],
+    )
+    for email_to, name in recipients:
+        html_content = template.render({"name": name or email_to})
+        yield (
+            email_to,
+            EmailData(html_content=html_content, subject=f"{project_name} - {subject}"),
+        )
+
+
 def generate_password_reset_token(email: str) -> str:
     delta = timedelta(hours=settings.EMAIL_RESET_TOKEN_EXPIRE_HOURS)
     now = datetime.now(timezone.utc)
@@ -121,3 +204,43 @@ def verify_password_reset_token(token: str) -> str | None:
         return str(decoded_token["sub"])
     except InvalidTokenError:
         return None
+
+
+def iter_validated_rows(
+    rows: Iterable[dict[str, Any]], model: type[ModelT]
+) -> Iterator[tuple[int, ModelT | BulkRowError]]:
+    """
+    Validate rows one at a time, yielding each row's index with either the
+    validated model or its error entry. Rows are never held in memory.
+    """
+    for index, row in enumerate(rows):
+        try:
+            yield index, model.model_validate(row)
+        except ValidationError as e:
+            yield (
+                index,
+                BulkRowError(
+                    index=index,
+                    errors=[
+                        {"loc": err["loc"], "msg": err["msg"], "type": err["type"]}
+                        for err in e.errors()
+                    ],
+                ),
+            )
+
+
+def validate_rows(
+    rows: list[dict[str, Any]], model: type[ModelT]
+) -> tuple[list[tuple[int, ModelT]], list[BulkRowError]]:
+    """
+    Validate every row of a bulk payload, returning the valid rows with their
+    index in the payload and an error entry for each invalid one.
+    """
+    valid: list[tuple[int, ModelT]] = []
+    errors: list[BulkRowError] = []
+    for index, result in iter_validated_rows(rows, model):
+        if isinstance(result, BulkRowError):
+            errors.append(result)
+        else:
+            valid.append((index, result))
+    return valid, errors
@@ -9,5 +9,8 @@ python app/backend_pre_start.py
 # Run migrations
 alembic upgrade head
 
+# Finish user deletions interrupted by a restart
+python app/purge_users.py
+
 # Create initial data in DB
 python app/initial_data.py
@@ -0,0 +1,18 @@
+#! /usr/bin/env bash
+
+set -e
+set -x
+
+# Delete data past its retention, run periodically by the prune service
+
+# Deletion records of synced tables
+python app/prune_tombstones.py
+
+# Sent and abandoned emails of the outbox
+python app/prune_email_outbox.py
+
+# Expired refresh tokens
+python app/prune_refresh_tokens.py
+
+# Idle rate limit buckets, only used with RATE_LIMIT_STORE=postgres
+python app/prune_rate_limit_buckets.py
@@ -212,12 +212,28 @@ export const NewPasswordSchema = {
   title: "NewPassword",
 } as const
 
+export const RefreshTokenRequestSchema = {
+  properties: {
+    refresh_token: {
+      type: "string",
+      title: "Refresh Token",
+    },
+  },
+  type: "object",
+  required: ["refresh_token"],
+  title: "RefreshTokenRequest",
+} as const
+
 export const TokenSchema = {
   properties: {
     access_token: {
       type: "string",
       title: "Access Token",
     },
+    refresh_token: {
+      type: "string",
+      title: "Refresh Token",
+    },
     token_type: {
       type: "string",
       title: "Token Type",
@@ -225,7 +241,7 @@ export const TokenSchema = {
     },
   },
   type: "object",
-  required: ["access_token"],
+  required: ["access_token", "refresh_token"],
   title: "Token",
 } as const
 
@@ -16,6 +16,10 @@ import type {
   ItemsDeleteItemResponse,
   LoginLoginAccessTokenData,
   LoginLoginAccessTokenResponse,
+  LoginRefreshAccessTokenData,
+  LoginRefreshAccessTokenResponse,
+  LoginLogoutData,
+  LoginLogoutResponse,
   LoginTestTokenResponse,
   LoginRecoverPasswordData,
   LoginRecoverPasswordResponse,
@@ -190,6 +194,51 @@ export class LoginService {
     })
   }
 
+  /**
+   * Refresh Access Token
+   * Exchange a refresh token for a new access token and refresh token, the
+   * refresh token can't be used again
+   * @param data The data for the request.
+   * @param data.requestBody
+   * @returns Token Successful Response
+   * @throws ApiError
+   */
+  public static refreshAccessToken(
+    data: LoginRefreshAccessTokenData,
+  ): CancelablePromise<LoginRefreshAccessTokenResponse> {
+    return __request(OpenAPI, {
+      method: "POST",
+      url: "/api/v1/login/refresh",
+      body: data.requestBody,
+      mediaType: "application/json",
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
+  /**
+   * Logout
+   * Revoke a refresh token, the ones issued after it and their access tokens
+   * @param data The data for the request.
+   * @param data.requestBody
+   * @returns Message Successful Response
+   * @throws ApiError
+   */
+  public static logout(
+    data: LoginLogoutData,
+  ): CancelablePromise<LoginLogoutResponse> {
+    return __request(OpenAPI, {
+      method: "POST",
+      url: "/api/v1/logout",
+      body: data.requestBody,
+      mediaType: "application/json",
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
   /**
    * Test Token
    * Test access token
@@ -44,8 +44,13 @@ export type NewPassword = {
   new_password: string
 }
 
+export type RefreshTokenRequest = {
+  refresh_token: string
+}
+
 export type Token = {
   access_token: string
+  refresh_token: string
   token_type?: string
 }
 
@@ -138,6 +143,18 @@ export type LoginLoginAccessTokenData = {
 
 export type LoginLoginAccessTokenResponse = Token
 
+export type LoginRefreshAccessTokenData = {
+  requestBody: RefreshTokenRequest
+}
+
+export type LoginRefreshAccessTokenResponse = Token
+
+export type LoginLogoutData = {
+  requestBody: RefreshTokenRequest
+}
+
+export type LoginLogoutResponse = Message
+
 export type LoginTestTokenResponse = UserPublic
 
 export type LoginRecoverPasswordData = {
@@ -7,16 +7,80 @@ import {
   type Body_login_login_access_token as AccessToken,
   type ApiError,
   LoginService,
+  type Token,
   type UserPublic,
   type UserRegister,
   UsersService,
 } from "../client"
 import useCustomToast from "./useCustomToast"
 
+// Access tokens are refreshed when they expire within this many milliseconds
+const REFRESH_MARGIN = 30_000
+
 const isLoggedIn = () => {
   return localStorage.getItem("access_token") !== null
 }
 
+const storeTokens = (token: Token) => {
+  localStorage.setItem("access_token", token.access_token)
+  localStorage.setItem("refresh_token", token.refresh_token)
+}
+
+const clearTokens = () => {
+  localStorage.removeItem("access_token")
+  localStorage.removeItem("refresh_token")
+}
+
+const expiresAt = (token: string) => {
+  try {
+    const payload = token.split(".")[1].replace(/-/g, "+").replace(/_/g, "/")
+    return JSON.parse(atob(payload)).exp * 1000
+  } catch {
+    return 0
+  }
+}
+
+const refreshTokens = async () => {
+  // Each refresh token can be used once, tabs take turns so they don't use
+  // the same one, which would revoke the session
+  await navigator.locks.request("refresh_token", async () => {
+    const accessToken = localStorage.getItem("access_token")
+    const refreshToken = localStorage.getItem("refresh_token")
+    if (!accessToken || !refreshToken) {
+      return
+    }
+    if (expiresAt(accessToken) - Date.now() > REFRESH_MARGIN) {
+      // Refreshed by another tab meanwhile
+      return
+    }
+    try {
+      storeTokens(
+        await LoginService.refreshAccessToken({
+          requestBody: { refresh_token: refreshToken },
+        }),
+      )
+    } catch {
+      // Expired or revoked, the user has to log in again
+      clearTokens()
+      window.location.href = "/login"
+    }
+  })
+}
+
+// Resolves the token sent with every request, refreshing it shortly before it
+// expires
+const getAccessToken = async ({ url }: { url: string }) => {
+  const accessToken = localStorage.getItem("access_token")
+  if (
+    accessToken &&
+    url !== "/api/v1/login/refresh" &&
+    expiresAt(accessToken) - Date.now() <= REFRESH_MARGIN
+  ) {
+    await refreshTokens()
+  }
+  return localStorage.getItem("access_token") || ""
+}
+
 const useAuth = () => {
   const [error, setError] = useState<string | null>(null)
   const navigate = useNavigate()
@@ -58,7 +122,7 @@ const useAuth = () => {
     const response = await LoginService.loginAccessToken({
       formData: data,
     })
-    localStorage.setItem("access_token", response.access_token)
+    storeTokens(response)
   }
 
   const loginMutation = useMutation({
@@ -82,7 +146,14 @@ const useAuth = () => {
   })
 
   const logout = () => {
-    localStorage.removeItem("access_token")
+    const refreshToken = localStorage.getItem("refresh_token")
+    clearTokens()
+    if (refreshToken) {
+      // Revokes the session on the server, the user is logged out either way
+      LoginService.logout({
+        requestBody: { refresh_token: refreshToken },
+      }).catch(() => {})
+    }
     navigate({ to: "/login" })
   }
 
@@ -97,5 +168,5 @@ const useAuth = () => {
   }
 }
 
-export { isLoggedIn }
+export { getAccessToken, isLoggedIn }
 export default useAuth
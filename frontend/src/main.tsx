@@ -6,12 +6,11 @@ import { routeTree } from "./routeTree.gen"
 
 import { StrictMode } from "react"
 import { OpenAPI } from "./client"
+import { getAccessToken } from "./hooks/useAuth"
 import theme from "./theme"
 
 OpenAPI.BASE = import.meta.env.VITE_API_URL
-OpenAPI.TOKEN = async () => {
-  return localStorage.getItem("access_token") || ""
-}
+OpenAPI.TOKEN = getAccessToken
 
 const queryClient = new QueryClient()
 